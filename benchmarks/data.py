@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+# standard sampling depths of the Swedish monitoring programme
+DEPTHS = np.array(
+    [0, 5, 10, 15, 20, 25, 30, 40, 50, 60, 70, 80, 90, 100]
+    + [125, 150, 200, 225, 300, 400]
+)
+
+# flag distributions roughly as in SHARK exports
+FLAGS = {
+    "nutrient": (["1_0", "0_0", "6_0", "<_0", "4_0", "3_0", "B_0", "S_0"], [0.55, 0.2, 0.1, 0.08, 0.03, 0.02, 0.01, 0.01]),
+    "oxygen": (["1_0", "0_0", "<_0", "6_0", "4_0", "S_0", "B_0"], [0.6, 0.25, 0.05, 0.03, 0.03, 0.02, 0.02]),
+    "h2s": (["1_0", "0_0", "<_0", "6_0", "4_0", "Z_0", "S_0"], [0.3, 0.4, 0.1, 0.1, 0.05, 0.03, 0.02]),
+}  # fmt: skip
+
+
+def _flags(rng, kind, size):
+    values, probabilities = FLAGS[kind]
+    return pd.Categorical.from_codes(
+        rng.choice(len(values), size, p=probabilities), categories=values
+    ).astype(object)
+
+
+def _values(rng, low, high, size, missing):
+    values = rng.uniform(low, high, size)
+    values[rng.random(size) < missing] = np.nan
+    return values
+
+
+def synthetic_frame(size: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Returns a SHARK-like frame with size rows of bottle data
+    """
+    rng = np.random.default_rng(seed)
+    depth = rng.choice(DEPTHS, size)
+    doxy_btl = _values(rng, 0, 9, size, 0.2)
+    anoxic = doxy_btl < 0.5
+    h2s = np.where(anoxic, rng.uniform(1, 60, size), np.nan)
+    return pd.DataFrame(
+        {
+            "depth": depth,
+            "temp": rng.uniform(0, 20, size) - depth / 100,
+            "salt": rng.uniform(2, 35, size),
+            "DOXY_BTL": doxy_btl,
+            "Q_DOXY_BTL": _flags(rng, "oxygen", size),
+            "DOXY_CTD": _values(rng, 0, 9, size, 0.4),
+            "Q_DOXY_CTD": _flags(rng, "oxygen", size),
+            "H2S": h2s,
+            "Q_H2S": _flags(rng, "h2s", size),
+            "NTRA": _values(rng, 0, 15, size, 0.1),
+            "Q_NTRA": _flags(rng, "nutrient", size),
+            "NTRI": _values(rng, 0, 1, size, 0.1),
+            "Q_NTRI": _flags(rng, "nutrient", size),
+            "NTRZ": _values(rng, 0, 16, size, 0.6),
+            "Q_NTRZ": _flags(rng, "nutrient", size),
+            "AMON": _values(rng, 0, 10, size, 0.1),
+            "Q_AMON": _flags(rng, "nutrient", size),
+            "PHOS": _values(rng, 0, 0.003, size, 0.1),
+        }
+    ).assign(oxygen=lambda df: df.DOXY_BTL)
@@ -0,0 +1,128 @@
+"""
+Times every public calculation on synthetic SHARK-like frames and writes the results
+as JSON. Compare against an earlier run with --compare.
+
+    python benchmarks/run.py --sizes 1000 100000 10000000 --output results.json
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from nodc_calculations import calculate, convert
+from nodc_calculations._version import version
+
+from data import synthetic_frame
+
+CALCULATIONS = {
+    "dissolved_inorganic_nitrogen": calculate.dissolved_inorganic_nitrogen,
+    "oxygen": calculate.oxygen,
+    "density": calculate.density,
+    "oxygen_saturation": calculate.oxygen_saturation,
+    "oxygen_ml2umol": functools.partial(
+        convert.oxygen_ml2umol, oxygen_column_name="oxygen"
+    ),
+    "gram_per_liter_to_mol_per_liter": functools.partial(
+        convert.gram_per_liter_to_mol_per_liter,
+        nutrient="P",
+        incoming_column_name="PHOS",
+        out_column_name="PHOS_mol",
+    ),
+}
+
+
+def measure(function, data, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        frame = data.copy()
+        start = time.perf_counter()
+        function(frame)
+        times.append(time.perf_counter() - start)
+
+    # memory is measured in a separate run since tracing slows down the calculation
+    frame = data.copy()
+    tracemalloc.start()
+    function(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(times)
+    return {
+        "rows": len(data),
+        "seconds": seconds,
+        "rows_per_second": len(data) / seconds if seconds else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def run(sizes, names, repeat: int) -> dict:
+    # warm up, e.g. compile the numba kernels, before anything is timed
+    for name in names:
+        CALCULATIONS[name](synthetic_frame(10))
+
+    results = []
+    for size in sizes:
+        data = synthetic_frame(size)
+        for name in names:
+            result = {"calculation": name} | measure(CALCULATIONS[name], data, repeat)
+            print(
+                f"{name:35} {size:>10} rows {result['seconds']:10.4f} s "
+                f"{result['peak_memory_bytes'] / 2**20:10.1f} MiB",
+                file=sys.stderr,
+            )
+            results.append(result)
+    return {
+        "version": version(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "results": results,
+    }
+
+
+def compare(previous: dict, current: dict):
+    before = {(r["calculation"], r["rows"]): r for r in previous["results"]}
+    print(f"{'calculation':35} {'rows':>10} {'time':>8} {'memory':>8}")
+    for result in current["results"]:
+        old = before.get((result["calculation"], result["rows"]))
+        if old is None:
+            continue
+        print(
+            f"{result['calculation']:35} {result['rows']:>10} "
+            f"{result['seconds'] / old['seconds']:8.2f} "
+            f"{result['peak_memory_bytes'] / max(old['peak_memory_bytes'], 1):8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument(
+        "--calculations", nargs="+", choices=CALCULATIONS, default=list(CALCULATIONS)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument(
+        "--compare", help="print time and memory ratios against this JSON file"
+    )
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.calculations, args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
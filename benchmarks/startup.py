@@ -0,0 +1,54 @@
+"""
+Times the import of nodc_calculations modules, and the first call of a calculation,
+in fresh interpreters, with the start of the interpreter itself subtracted.
+
+    python benchmarks/startup.py --repeat 10
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+STATEMENTS = {
+    "interpreter": "pass",
+    "import calculate": "import nodc_calculations.calculate",
+    "import pipeline": "import nodc_calculations.pipeline",
+    "first din": (
+        "import pandas as pd\n"
+        "from nodc_calculations import calculate\n"
+        "columns = ('NTRA', 'NTRI', 'NTRZ', 'AMON', 'H2S', 'DOXY_BTL')\n"
+        "calculate.dissolved_inorganic_nitrogen(pd.DataFrame("
+        "{c: [1.0] for c in columns} | {f'Q_{c}': ['1_0'] for c in columns}))"
+    ),
+    "first density": (
+        "import pandas as pd\n"
+        "from nodc_calculations import calculate\n"
+        "calculate.density(pd.DataFrame({'salt': [30], 'temp': [10], 'depth': [0]}))"
+    ),
+}
+
+
+def measure(statement: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    interpreter = measure(STATEMENTS["interpreter"], args.repeat)
+    print(f"{'interpreter':20} {interpreter:8.3f} s")
+    for name, statement in list(STATEMENTS.items())[1:]:
+        seconds = measure(statement, args.repeat) - interpreter
+        print(f"{name:20} {seconds:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
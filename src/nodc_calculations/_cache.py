@@ -0,0 +1,11 @@
+import os
+import pathlib
+
+# The cache directory shared by the lookup tables, the result store and the
+# generated kernels. Kept free of dependencies so that it can be imported anywhere.
+
+
+def default_cache_dir() -> pathlib.Path:
+    if "NODC_CALCULATIONS_CACHE" in os.environ:
+        return pathlib.Path(os.environ["NODC_CALCULATIONS_CACHE"])
+    return pathlib.Path.home() / ".cache" / "nodc_calculations"
@@ -0,0 +1,14 @@
+import importlib.metadata
+
+# The installed version of the package, recorded with stored and written results.
+
+
+def version() -> str:
+    """
+    Returns the installed version, or "unknown" in a source checkout that is not
+    installed
+    """
+    try:
+        return importlib.metadata.version("nodc-calculations")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
@@ -0,0 +1,359 @@
+import numpy as np
+import pandas as pd
+
+from nodc_calculations import diagnostics, flags, kernels, profiling, rules
+
+# Array versions of the calculations. The functions take NumPy arrays, Arrow arrays,
+# pandas or Polars Series or anything else supporting the buffer protocol, never
+# modify their inputs and return new NumPy arrays. Flag arguments are Q_ columns
+# (strings, categoricals or Arrow dictionaries) or bitmasks from flags.encode.
+# The backend argument of the seawater functions is any object with the gsw functions
+# pot_rho_t_exact and O2sol_SP_pt, e.g. a memo.SeawaterCache. It defaults to gsw.
+# gsw is imported in the functions using it, to keep the import of the package fast.
+
+# latitude for the pressure when there is no latitude per row, the latitude has
+# little effect on the results in Swedish waters
+LATITUDE = 58
+
+# µmol per ml of oxygen
+UMOL_PER_ML_OXYGEN = 44.661
+
+# molar mass of relevant nutrients
+GRAM_PER_MOL = {
+    "N": 14.006720,
+    "P": 30.973762,
+    "SI": 28.085530,
+}
+
+
+def _values(values) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    if type(values).__module__.startswith("pyarrow"):
+        values = values.to_numpy(zero_copy_only=False)
+    elif type(values).__module__.startswith("polars"):
+        values = values.to_numpy()
+    return np.asarray(values, dtype=np.float64)
+
+
+def _bits(q) -> np.ndarray:
+    if getattr(q, "dtype", None) == np.uint8:
+        return np.asarray(q)
+    return flags.encode(q)
+
+
+def din(
+    ntra,
+    q_ntra,
+    ntri,
+    q_ntri,
+    ntrz,
+    q_ntrz,
+    amon,
+    q_amon,
+    h2s,
+    q_h2s,
+    doxy_btl,
+    q_doxy_btl,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates DIN based on nitrogen components, oxygen and hydrogen sulphide and
+    quality flags. Returns NTRZ_corrected and DIN.
+    """
+    with profiling.stage("din.flags", ntra):
+        arguments = [
+            function(argument)
+            for argument, function in zip(
+                (ntra, q_ntra, ntri, q_ntri, ntrz, q_ntrz, amon, q_amon, h2s, q_h2s, doxy_btl, q_doxy_btl),
+                (_values, _bits) * 6,
+            )
+        ]  # fmt: skip
+    if kernels.numba is None:
+        ntrz_corrected, result = _din(*arguments)
+    else:
+        with profiling.stage("din.kernel", ntra):
+            context = _din_context(None, *arguments)
+            results = rules.compile(_DIN_SELECTIONS)(context.values, context.bits)
+            ntrz_corrected, result = results["NTRZ_corrected"], results["din"]
+
+    diagnostics.branch_counts(
+        "din", lambda: _din_branches(ntrz_corrected, *arguments), len(result)
+    )
+    return ntrz_corrected, result
+
+
+# Create NTRZ from NTRA+NTRI when NTRZ not valid
+NTRZ_CORRECTED = rules.Selection(
+    (
+        # both below lmtQ_
+        rules.Rule(
+            "below_detection",
+            rules.Missing("NTRZ")
+            & rules.BelowDetection("NTRA")
+            & rules.BelowDetection("NTRI"),
+            "NTRA",
+        ),
+        # at least NTRA valid
+        rules.Rule(
+            "ntra",
+            rules.Missing("NTRZ") & rules.Valid("NTRA"),
+            rules.Sum(("NTRA", "NTRI"), skipna=True),
+        ),
+        # NTRZ valid
+        rules.Rule("ntrz", rules.Valid("NTRZ"), "NTRZ"),
+    )
+)
+
+_VALID_NTRZ_CORRECTED = ~rules.Missing("NTRZ_corrected")
+_VALID_H2S = rules.Valid("H2S", "643BS<")
+_VALID_AMON = rules.Valid("AMON")
+_BELOW_DET_AMON = rules.BelowDetection("AMON")
+_VALID_LOW_DOXY = rules.AtMost("DOXY_BTL", 2) & ~rules.Flagged(
+    "DOXY_BTL", flags.REJECTED
+)
+
+DIN = rules.Selection(
+    (
+        # Övriga fall där NTRZ används som huvudsaklig parameter:
+        # NTRZ_corrected + AMON om båda är giltiga, annars NTRZ_corrected om AMON är under det
+        rules.Rule(
+            "ntrz_corrected_and_amon",
+            _VALID_AMON
+            & ~_VALID_LOW_DOXY
+            & ~_VALID_H2S
+            & ~_BELOW_DET_AMON
+            & _VALID_NTRZ_CORRECTED,
+            rules.Sum(("NTRZ_corrected", "AMON")),
+        ),
+        rules.Rule(
+            "amon_below_detection",
+            ~_VALID_LOW_DOXY & ~_VALID_H2S & _BELOW_DET_AMON & _VALID_NTRZ_CORRECTED,
+            "NTRZ_corrected",
+        ),
+        # Typiskt sommaren när alla är under det
+        rules.Rule(
+            "below_detection",
+            (rules.BelowDetection("NTRZ") | rules.BelowDetection("NTRA"))
+            & _BELOW_DET_AMON
+            & _VALID_NTRZ_CORRECTED,
+            "NTRZ_corrected",
+        ),
+        # I låga syrehalter beräkna din endast om AMON finns, antingen som summa
+        # AMON+NTRZ_corrected eller endast som AMON om NTRZ_corrected är nan.
+        rules.Rule(
+            "low_oxygen",
+            _VALID_LOW_DOXY & _VALID_AMON,
+            rules.Sum(("NTRZ_corrected", "AMON"), skipna=True),
+        ),
+        # Fall där H2S är giltigt och NH4 är giltigt
+        rules.Rule("h2s", _VALID_H2S & _VALID_AMON, "AMON"),
+    )
+)
+
+# compiled into one loop when numba is installed
+_DIN_SELECTIONS = (("NTRZ_corrected", NTRZ_CORRECTED), ("din", DIN))
+
+_VALID_BTL = rules.Valid("DOXY_BTL", "BS<436")
+_BELOW_DET_BTL = rules.BelowDetection("DOXY_BTL", "<6")
+_BELOW_DET_CTD = rules.BelowDetection("DOXY_CTD", "<")
+
+OXYGEN = rules.Selection(
+    (
+        # h2s valid -> h2s default (0)
+        rules.Rule("h2s", rules.Valid("H2S", "BSZ<436"), 0),
+        # both h2s and oxygen below det -> 0
+        rules.Rule(
+            "h2s_and_oxygen_below_detection",
+            rules.BelowDetection("H2S", "<6")
+            & (_BELOW_DET_BTL | (_BELOW_DET_CTD & ~_VALID_BTL)),
+            0,
+        ),
+        # O2 BTL is valid -> O2 BTL
+        rules.Rule("btl", _VALID_BTL | _BELOW_DET_BTL, "DOXY_BTL"),
+        # O2 CTD exists and Q O2 CTD is not B|S|< -> O2 CTD
+        rules.Rule("ctd", rules.Valid("DOXY_CTD", "BS<436"), "DOXY_CTD"),
+        rules.Rule("ctd_below_detection", _BELOW_DET_CTD, 0),
+    )
+)
+_OXYGEN_SELECTIONS = (("oxygen", OXYGEN),)
+
+
+def _din_context(
+    ntrz_corrected, ntra, q_ntra, ntri, q_ntri, ntrz, q_ntrz, amon, q_amon, h2s, q_h2s,
+    doxy_btl, q_doxy_btl,
+) -> rules.Context:  # fmt: skip
+    return rules.Context(
+        {"NTRZ_corrected": ntrz_corrected, "NTRA": ntra, "NTRI": ntri, "NTRZ": ntrz,
+         "AMON": amon, "H2S": h2s, "DOXY_BTL": doxy_btl},
+        {"NTRA": q_ntra, "NTRI": q_ntri, "NTRZ": q_ntrz, "AMON": q_amon,
+         "H2S": q_h2s, "DOXY_BTL": q_doxy_btl},
+    )  # fmt: skip
+
+
+def _din_branches(ntrz_corrected, *arguments) -> dict[str, np.ndarray]:
+    # conditions for the DIN branches, highest priority first
+    return DIN.conditions(_din_context(ntrz_corrected, *arguments))
+
+
+def _din(
+    ntra,
+    q_ntra,
+    ntri,
+    q_ntri,
+    ntrz,
+    q_ntrz,
+    amon,
+    q_amon,
+    h2s,
+    q_h2s,
+    doxy_btl,
+    q_doxy_btl,
+):
+    # NumPy implementation, used when numba is not installed
+    arguments = (ntra, q_ntra, ntri, q_ntri, ntrz, q_ntrz, amon, q_amon, h2s, q_h2s,
+                 doxy_btl, q_doxy_btl)  # fmt: skip
+    # one context, so that conditions shared by the selections are evaluated once
+    context = _din_context(None, *arguments)
+    with profiling.stage("din.ntrz_corrected", ntra):
+        ntrz_corrected = NTRZ_CORRECTED.select(context)
+        context.values["NTRZ_corrected"] = ntrz_corrected
+
+    with profiling.stage("din.selection", ntra):
+        result = DIN.select(context)
+
+    return ntrz_corrected, result
+
+
+def oxygen(
+    doxy_btl, q_doxy_btl, doxy_ctd, q_doxy_ctd, h2s=None, q_h2s=None
+) -> np.ndarray:
+    """
+    Selects oxygen from bottle or CTD values, or 0 when hydrogen sulphide is present.
+    h2s and q_h2s are optional.
+    """
+    with profiling.stage("oxygen.flags", doxy_btl):
+        doxy_btl, q_btl = _values(doxy_btl), _bits(q_doxy_btl)
+        doxy_ctd, q_ctd = _values(doxy_ctd), _bits(q_doxy_ctd)
+        # Handle missing H2S and Q_H2S: without H2S no row has valid H2S, without
+        # Q_H2S every H2S value is valid
+        h2s = np.full(len(doxy_btl), np.nan) if h2s is None else _values(h2s)
+        q_h2s = np.zeros(len(h2s), np.uint8) if q_h2s is None else _bits(q_h2s)
+
+    with profiling.stage("oxygen.selection", doxy_btl):
+        context = rules.Context(
+            {"DOXY_BTL": doxy_btl, "DOXY_CTD": doxy_ctd, "H2S": h2s},
+            {"DOXY_BTL": q_btl, "DOXY_CTD": q_ctd, "H2S": q_h2s},
+        )
+        if kernels.numba is None:
+            result = OXYGEN.select(context)
+        else:
+            result = rules.compile(_OXYGEN_SELECTIONS)(context.values, context.bits)
+            result = result["oxygen"]
+
+    diagnostics.branch_counts("oxygen", lambda: OXYGEN.conditions(context), len(result))
+    return result
+
+
+def pressure(depth, latitude=LATITUDE) -> np.ndarray:
+    """
+    Sea pressure from depth. latitude is a constant or one latitude per depth.
+    """
+    from gsw.conversions import p_from_z
+
+    if np.ndim(latitude):
+        latitude = _values(latitude)
+    with profiling.stage("pressure", depth):
+        return np.asarray(p_from_z(-_values(depth), latitude))
+
+
+def potential_temperature(salt, temp) -> np.ndarray:
+    from gsw.conversions import pt_from_CT
+
+    with profiling.stage("potential_temperature", salt):
+        return np.asarray(pt_from_CT(_values(salt), _values(temp)))
+
+
+def density(salt, temp, depth, p=None, backend=None, latitude=LATITUDE) -> np.ndarray:
+    """
+    Potential density at the surface. An already calculated sea pressure p is used
+    instead of the depth.
+    """
+    if backend is None:
+        import gsw as backend
+    if p is None:
+        p = pressure(depth, latitude)
+    with profiling.stage("density", salt):
+        return np.asarray(
+            backend.pot_rho_t_exact(_values(salt), _values(temp), _values(p), 0)
+        )
+
+
+def oxygen_solubility(salt, temp, density, pt=None, backend=None) -> np.ndarray:
+    """
+    Oxygen solubility in ml/l. An already calculated potential temperature pt is
+    used instead of the temperature.
+    """
+    if backend is None:
+        import gsw as backend
+    if pt is None:
+        pt = potential_temperature(salt, temp)
+    with profiling.stage("oxygen_solubility", salt):
+        return np.asarray(
+            backend.O2sol_SP_pt(_values(salt), _values(pt))
+            * (_values(density) / 1000)
+            / UMOL_PER_ML_OXYGEN
+        )
+
+
+def oxygen_saturation(oxygen, solubility) -> np.ndarray:
+    """
+    Oxygen saturation in percent, oxygen and solubility in the same unit
+    """
+    return _values(oxygen) / _values(solubility) * 100
+
+
+def apparent_oxygen_utilization(oxygen, solubility) -> np.ndarray:
+    """
+    AOU, oxygen and solubility in the same unit
+    """
+    return _values(solubility) - _values(oxygen)
+
+
+def oxygen_parameters(
+    salt, temp, depth, oxygen, p=None, backend=None, latitude=LATITUDE
+) -> dict[str, np.ndarray]:
+    """
+    Calculates density, oxygen solubility, oxygen saturation and AOU from oxygen in
+    ml/l, and oxygen, oxygen solubility and AOU in µmol/kg. Potential temperature,
+    density and solubility are calculated once and shared.
+    """
+    salt, oxygen = _values(salt), _values(oxygen)
+    pt = potential_temperature(salt, temp)
+    rho = density(salt, temp, depth, p=p, backend=backend, latitude=latitude)
+    solubility = oxygen_solubility(salt, None, rho, pt=pt, backend=backend)
+    aou = apparent_oxygen_utilization(oxygen, solubility)
+    return {
+        "density": rho,
+        "oxygen_solubility": solubility,
+        "oxygen_saturation": oxygen_saturation(oxygen, solubility),
+        "aou": aou,
+        "oxygen_umol_kg": oxygen_ml2umol_per_kg(oxygen, rho),
+        "oxygen_solubility_umol_kg": oxygen_ml2umol_per_kg(solubility, rho),
+        "aou_umol_kg": oxygen_ml2umol_per_kg(aou, rho),
+    }
+
+
+def oxygen_ml2umol(oxygen) -> np.ndarray:
+    return _values(oxygen) * UMOL_PER_ML_OXYGEN
+
+
+def oxygen_ml2umol_per_kg(oxygen, density) -> np.ndarray:
+    """
+    Converts oxygen from ml/l to µmol/kg, density in kg/m3
+    """
+    return _values(oxygen) * UMOL_PER_ML_OXYGEN / (_values(density) / 1000)
+
+
+def gram_per_liter_to_mol_per_liter(values, nutrient: str) -> np.ndarray:
+    # convert g/l to mol/l by dividing with the molar mass
+    return _values(values) / GRAM_PER_MOL[nutrient]
@@ -0,0 +1,116 @@
+from typing import Callable
+
+import pandas as pd
+
+from nodc_calculations import arrays, calculate
+
+# DIN and oxygen for pandas DataFrames, Arrow tables and Polars DataFrames or
+# LazyFrames. Arrow and Polars data are passed column by column to the NumPy
+# functions in arrays without converting the frame to pandas. This is not a native
+# Polars implementation: the calculation is a map_batches function over NumPy
+# arrays, which Polars can not optimize or stream, and a LazyFrame only defers it
+# until collect. Missing results are nulls in Arrow and Polars and NaN in pandas.
+
+DIN_INPUTS = tuple(
+    column
+    for parameter in ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL")
+    for column in (parameter, f"Q_{parameter}")
+)
+OXYGEN_INPUTS = ("DOXY_BTL", "Q_DOXY_BTL", "DOXY_CTD", "Q_DOXY_CTD")
+H2S_INPUTS = ("H2S", "Q_H2S")
+
+
+def _kind(data) -> str:
+    if isinstance(data, pd.DataFrame):
+        return "pandas"
+    module = type(data).__module__
+    if module.startswith("pyarrow"):
+        return "arrow"
+    if module.startswith("polars"):
+        return "polars"
+    raise TypeError(f"Unsupported data type: {type(data).__name__}")
+
+
+def _columns(data) -> list[str]:
+    kind = _kind(data)
+    if kind == "arrow":
+        return data.column_names
+    if kind == "polars":
+        return data.collect_schema().names()
+    return list(data.columns)
+
+
+def _with_columns(data, inputs: tuple[str, ...], function: Callable, outputs):
+    # function gets the input columns as a dict and returns the output arrays
+    if _kind(data) == "arrow":
+        import pyarrow as pa
+
+        results = function({column: data[column] for column in inputs})
+        for name, values in zip(outputs, results):
+            values = pa.array(values, from_pandas=True)
+            if name in data.column_names:
+                data = data.set_column(data.column_names.index(name), name, values)
+            else:
+                data = data.append_column(name, values)
+        return data
+
+    import polars as pl
+
+    def batch(struct):
+        results = function({column: struct.struct.field(column) for column in inputs})
+        return pl.DataFrame(
+            {
+                name: pl.Series(name, values, nan_to_null=True)
+                for name, values in zip(outputs, results)
+            }
+        ).to_struct()
+
+    expression = pl.struct(inputs).map_batches(
+        batch,
+        return_dtype=pl.Struct({name: pl.Float64 for name in outputs}),
+        is_elementwise=True,
+    )
+    return (
+        data.drop(outputs, strict=False)
+        .with_columns(expression.alias("_nodc_calculations"))
+        .unnest("_nodc_calculations")
+    )
+
+
+def dissolved_inorganic_nitrogen(data):
+    """
+    Adds NTRZ_corrected and din to data, see calculate.dissolved_inorganic_nitrogen.
+    Arrow tables and Polars frames are not modified, a new table or frame is returned.
+    """
+    if _kind(data) == "pandas":
+        return calculate.dissolved_inorganic_nitrogen(data)
+    return _with_columns(
+        data,
+        DIN_INPUTS,
+        lambda columns: arrays.din(*(columns[column] for column in DIN_INPUTS)),
+        ("NTRZ_corrected", "din"),
+    )
+
+
+def oxygen(data):
+    """
+    Adds oxygen to data, see calculate.oxygen. Arrow tables and Polars frames are not
+    modified, a new table or frame is returned.
+    """
+    if _kind(data) == "pandas":
+        return calculate.oxygen(data)
+    inputs = OXYGEN_INPUTS + tuple(
+        column for column in H2S_INPUTS if column in _columns(data)
+    )
+    return _with_columns(
+        data,
+        inputs,
+        lambda columns: (
+            arrays.oxygen(
+                *(columns[column] for column in OXYGEN_INPUTS),
+                h2s=columns.get("H2S"),
+                q_h2s=columns.get("Q_H2S"),
+            ),
+        ),
+        ("oxygen",),
+    )
@@ -1,9 +1,8 @@
-from seawater import satO2
-from gsw import O2sol_SP_pt, pot_rho_t_exact
-from gsw.conversions import p_from_z, pt_from_CT
 import pandas as pd
 import numpy as np
 
+from nodc_calculations import arrays, profiling
+
 
 def _get_DIN(data: dict):
     """
@@ -87,165 +86,132 @@ def _get_DIN(data: dict):
     return float(din)
 
 
-def dissolved_inorganic_nitrogen(df: pd.DataFrame):
+@profiling.profiled
+def dissolved_inorganic_nitrogen(df: pd.DataFrame, inplace: bool = True):
     """
     Calculates DIN values based on nitrogen components, oxygen and hydroggen sulphide and Q_uality flags
+    Adds the columns NTRZ_corrected and din to df and returns df,
+    or returns only din as a Series if inplace is False
     """
-
-    # define booleans for valid data and lmtQ_ for NTRZ, NTRA, NTRI
-    valid_NTRA = np.logical_and(~pd.isna(df.NTRA), ~df.Q_NTRA.str.contains("4|3|B|S"))
-    below_det_NTRA = np.logical_and(~pd.isna(df.NTRA), df.Q_NTRA.str.contains("6|<"))
-
-    valid_NTRI = np.logical_and(~pd.isna(df.NTRI), ~df.Q_NTRI.str.contains("4|3|B|S"))
-    below_det_NTRI = np.logical_and(~pd.isna(df.NTRI), df.Q_NTRI.str.contains("6|<"))
-
-    valid_NTRZ = np.logical_and(~pd.isna(df.NTRZ), ~df.Q_NTRZ.str.contains("4|3|B|S"))
-    below_det_NTRZ = np.logical_and(~pd.isna(df.NTRZ), df.Q_NTRZ.str.contains("6|<"))
-
-    # Create NTRZ column from NTRA+NTRI when NTRZ not valid
-    df["NTRZ_corrected"] = np.where(
-        pd.isna(df.NTRZ) & below_det_NTRA & below_det_NTRI,  # both below lmtQ_
-        df.NTRA,
-        np.where(
-            pd.isna(df.NTRZ) & valid_NTRA,  # at least NTRA valid
-            np.nansum([df.NTRA, df.NTRI], axis=0),
-            np.where(
-                valid_NTRZ,
-                df.NTRZ,  # NTRZ valid
-                np.nan,
-            ),
-        ),
+    ntrz_corrected, din = arrays.din(
+        *(
+            df[column]
+            for parameter in ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL")
+            for column in (parameter, f"Q_{parameter}")
+        )
     )
+    if not inplace:
+        return pd.Series(din, index=df.index, name="din")
 
-    # define booleans for valid data and lmtQ_ for other parameters
-    valid_NTRZ_corrected = ~pd.isna(df.NTRZ_corrected)
-    valid_H2S = np.logical_and(~pd.isna(df.H2S), ~df.Q_H2S.str.contains("6|4|3|B|S|<"))
-    valid_AMON = np.logical_and(~pd.isna(df.AMON), ~df.Q_AMON.str.contains("4|3|B|S"))
-    below_det_AMON = np.logical_and(~pd.isna(df.AMON), df.Q_AMON.str.contains("6|<"))
-    valid_low_doxy = np.logical_and(df.DOXY_BTL <= 2, ~df.Q_DOXY_BTL.str.contains("4|3|B|S"))
-
-    df["din"] = np.nan
+    with profiling.stage("dissolved_inorganic_nitrogen.assign", df):
+        df["NTRZ_corrected"] = ntrz_corrected
+        df["din"] = din
+    return df
 
-    # Fall där H2S är giltigt och NH4 är giltigt
-    df.loc[valid_H2S & valid_AMON, "din"] = df.AMON
 
-    # Steg 2: I låga syrehalter beräkna din endast
-    # om AMON finns, antingen som summa AMON+NTRZ_corrected eller endast som AMON om NTRZ_corrected är nan.
-    df["din"] = np.where(
-        valid_low_doxy & valid_AMON,
-        np.nansum([df.NTRZ_corrected, df.AMON], axis=0),
-        df.din,  # Om inget av ovanstående gäller, lämna som `din`
-    )
+def _latitude(df: pd.DataFrame, latitude: str | None):
+    return arrays.LATITUDE if latitude is None else df[latitude]
 
-    # Typiskt sommaren när alla är under det
-    df["din"] = np.where(
-        (below_det_NTRZ | below_det_NTRA)
-        & below_det_AMON
-        & ~pd.isna(
-            df.NTRZ_corrected
-        ),  # Använd NTRZ_corrected + AMON om båda är giltiga
-        df.NTRZ_corrected,
-        df.din,  # Om inget av ovanstående gäller, lämna som `din`
-    )
 
-    # Övriga fall där NTRZ används som huvudsaklig parameter
-    df["din"] = np.where(
-        valid_AMON
-        & ~valid_low_doxy
-        & ~valid_H2S
-        & ~below_det_AMON
-        & ~pd.isna(
-            df.NTRZ_corrected
-        ),  # Använd NTRZ_corrected + AMON om båda är giltiga
-        df.NTRZ_corrected + df.AMON,
-        np.where(
-            ~valid_low_doxy & ~valid_H2S & below_det_AMON & ~pd.isna(df.NTRZ_corrected),
-            df.NTRZ_corrected,
-            df.din,
-        ),  # Om inget av ovanstående gäller, lämna som `din`
+@profiling.profiled
+def density(
+    df: pd.DataFrame, inplace: bool = True, backend=None, latitude: str | None = None
+):
+    """
+    the sea pressure calculated from depth and latitude has very little effect on the results
+    a constant latitude is used unless latitude is the name of a latitude column
+    backend is passed on to arrays.density, e.g. a memo.SeawaterCache
+    """
+    density = arrays.density(
+        df.salt, df.temp, df.depth, backend=backend, latitude=_latitude(df, latitude)
     )
+    if not inplace:
+        return pd.Series(density, index=df.index, name="density")
 
-    return df
+    with profiling.stage("density.assign", df):
+        df.loc[:, "density"] = density
 
 
-def density(df: pd.DataFrame):
+@profiling.profiled
+def oxygen_saturation(
+    df: pd.DataFrame,
+    inplace: bool = True,
+    backend=None,
+    sw: bool = False,
+    latitude: str | None = None,
+):
     """
-    the sea pressure calculated from depth and latitude has very little effect on the results
-    use constant latitude, comnsider using constant z as well
+    Returns the oxygen solubility from gsw, the saturated oxygen concentration from
+    seawater.satO2 if sw is True, otherwise None, and df with the columns density
+    and oxygen_saturation added, or returns only oxygen_saturation as a Series if
+    inplace is False. latitude is used as in density.
     """
-    df.loc[:, "density"] = pot_rho_t_exact(df.salt, df.temp, p_from_z(-df.depth, 58), 0)
+    density = arrays.density(
+        df.salt, df.temp, df.depth, backend=backend, latitude=_latitude(df, latitude)
+    )
+    gsw = pd.Series(
+        arrays.oxygen_solubility(df.salt, df.temp, density, backend=backend),
+        index=df.index,
+    )
+    saturation = arrays.oxygen_saturation(df.oxygen, gsw)
+    if not inplace:
+        return pd.Series(saturation, index=df.index, name="oxygen_saturation")
 
+    with profiling.stage("oxygen_saturation.assign", df):
+        df.loc[:, "density"] = density
+        df.loc[:, "oxygen_saturation"] = saturation
 
-def oxygen_saturation(df: pd.DataFrame):
-    # oxygen_ml2umol(df, oxygen_column_name=oxygen_column_name)
-    pt = pt_from_CT(df.salt, df.temp)
-    density(df)
-    gsw = O2sol_SP_pt(df.salt, pt) * (df.density / 1000) / 44.661
-    sw = satO2(df.salt, df.temp)
+    if not sw:
+        return gsw, None, df
 
-    df.loc[:, "oxygen_saturation"] = df.oxygen / gsw * 100
+    # seawater is deprecated and only imported when asked for
+    from seawater import satO2
 
-    return gsw, sw, df
+    return gsw, satO2(df.salt, df.temp), df
 
 
-def oxygen(df: pd.DataFrame):
-    print(df)
-    valid_btl = np.logical_and(
-        ~pd.isna(df.DOXY_BTL), ~df.Q_DOXY_BTL.str.contains("B|S|<|4|3|6")
-    )
-    below_det_btl = np.logical_and(
-        ~pd.isna(df.DOXY_BTL), df.Q_DOXY_BTL.str.contains("<|6")
-    )
-    valid_ctd = np.logical_and(
-        ~pd.isna(df.DOXY_CTD), ~df.Q_DOXY_CTD.str.contains("B|S|<|4|3|6")
-    )
-    below_det_ctd = np.logical_and(
-        ~pd.isna(df.DOXY_CTD), df.Q_DOXY_CTD.str.contains("<")
+@profiling.profiled
+def oxygen_parameters(
+    df: pd.DataFrame, inplace: bool = True, backend=None, latitude: str | None = None
+):
+    """
+    Calculates density, oxygen_solubility, oxygen_saturation and aou (apparent oxygen
+    utilization) in ml/l and oxygen_umol_kg, oxygen_solubility_umol_kg and
+    aou_umol_kg in µmol/kg from oxygen in ml/l in one pass. latitude is used as in
+    density.
+    Adds the columns to df and returns df, or returns them as a DataFrame if inplace
+    is False
+    """
+    parameters = arrays.oxygen_parameters(
+        df.salt,
+        df.temp,
+        df.depth,
+        df.oxygen,
+        backend=backend,
+        latitude=_latitude(df, latitude),
     )
+    if not inplace:
+        return pd.DataFrame(parameters, index=df.index)
 
-    # Handle missing columns for H2S and Q_H2S
-    if "H2S" in df.columns and "Q_H2S" in df.columns:
-        valid_h2s = np.logical_and(
-            ~pd.isna(df.H2S), ~df.Q_H2S.str.contains("B|S|Z|<|4|3|6")
-        )
-        below_det_h2s = np.logical_and(~pd.isna(df.H2S), df.Q_H2S.str.contains("<|6"))
-    elif "H2S" in df.columns:
-        valid_h2s = ~pd.isna(df.H2S)
-        below_det_h2s = False
-    else:
-        # If either column is missing, set valid_h2s to False
-        valid_h2s = False
-        below_det_h2s = False
-    
-    # Apply nested np.where for all conditions
-    df["oxygen"] = np.where(
-        # h2s valid-> h2s default (0)
-        valid_h2s,
-        0,
-        # both h2s and oxygen below det
-        np.where(
-            np.logical_and(
-                below_det_h2s,
-                np.logical_or(below_det_btl, ((below_det_ctd) & (~valid_btl))),
-            ),
-            0,
-            #  O2 BTL is valid -> O2 BTL
-            np.where(
-                np.logical_or(valid_btl, below_det_btl),
-                df.DOXY_BTL,
-                # O2 CTD exists and Q O2 CTD is not B|S|< -> O2 CTD
-                np.where(
-                    (valid_ctd),
-                    df.DOXY_CTD,
-                    np.where(
-                        (below_det_ctd),
-                        0,
-                        # Default case gives NaN
-                        np.nan,
-                    ),
-                ),
-            ),
-        ),
+    with profiling.stage("oxygen_parameters.assign", df):
+        df[list(parameters)] = np.column_stack(list(parameters.values()))
+    return df
+
+
+@profiling.profiled
+def oxygen(df: pd.DataFrame, inplace: bool = True):
+    oxygen = arrays.oxygen(
+        df.DOXY_BTL,
+        df.Q_DOXY_BTL,
+        df.DOXY_CTD,
+        df.Q_DOXY_CTD,
+        # Handle missing columns for H2S and Q_H2S
+        df.H2S if "H2S" in df.columns else None,
+        df.Q_H2S if "Q_H2S" in df.columns else None,
     )
+    if not inplace:
+        return pd.Series(oxygen, index=df.index, name="oxygen")
 
+    with profiling.stage("oxygen.assign", df):
+        df["oxygen"] = oxygen
     return df
@@ -0,0 +1,194 @@
+"""
+Runs calculations on CSV, tab separated (e.g. SHARK export) and Parquet files and
+writes the results, in the same format, to an output directory.
+
+    nodc-calc data/*.txt -c dissolved_inorganic_nitrogen oxygen -o results -w 4
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import pathlib
+import sys
+import time
+
+from nodc_calculations import pipeline
+from nodc_calculations._version import version
+
+SUFFIXES = (".csv", *pipeline.TAB_SUFFIXES, *pipeline.PARQUET_SUFFIXES)
+# errors of a file that are reported without stopping the others, e.g. unreadable
+# files or missing columns
+ERRORS = (ValueError, OSError, KeyError)
+
+
+def _sources(patterns: list[str]) -> list[pathlib.Path]:
+    sources = []
+    for pattern in patterns:
+        paths = [pathlib.Path(path) for path in glob.glob(pattern, recursive=True)]
+        if not paths:
+            raise FileNotFoundError(f"No files match {pattern!r}")
+        for path in sorted(paths):
+            if path.is_dir():
+                sources.extend(
+                    sorted(p for p in path.iterdir() if p.suffix.lower() in SUFFIXES)
+                )
+            else:
+                sources.append(path)
+    return list(dict.fromkeys(sources))
+
+
+def _signature(source: pathlib.Path, calculations: list[str]) -> str:
+    # hash of the input file, the calculations and the library version
+    digest = hashlib.sha256(json.dumps([calculations, version()]).encode())
+    with open(source, "rb") as file:
+        for block in iter(lambda: file.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _signature_path(sink: pathlib.Path) -> pathlib.Path:
+    return sink.with_name(f"{sink.name}.sha256")
+
+
+def up_to_date(
+    source: pathlib.Path, sink: pathlib.Path, calculations: list[str], check: str
+) -> bool:
+    """
+    True if sink exists and is newer than source (check="mtime"), or was written from
+    the same source content, calculations and library version (check="hash")
+    """
+    if not sink.exists():
+        return False
+    if check == "mtime":
+        return sink.stat().st_mtime >= source.stat().st_mtime
+    signature = _signature_path(sink)
+    return signature.exists() and signature.read_text() == _signature(
+        source, calculations
+    )
+
+
+def process(
+    source: pathlib.Path,
+    sink: pathlib.Path,
+    calculations: list[str],
+    chunksize: int,
+    check: str,
+) -> int:
+    """
+    Runs the calculations on source chunk by chunk and writes sink, returns the
+    number of rows
+    """
+    # written under a temporary name so that an interrupted run is not up to date
+    temporary = sink.with_name(f".{sink.stem}.{os.getpid()}.tmp{sink.suffix}")
+    try:
+        rows = pipeline.stream(source, temporary, calculations, chunksize=chunksize)
+        os.replace(temporary, sink)
+    finally:
+        temporary.unlink(missing_ok=True)
+    if check == "hash":
+        _signature_path(sink).write_text(_signature(source, calculations))
+    return rows
+
+
+def _run(jobs: dict, args: argparse.Namespace):
+    # yields the source and the number of rows, or the exception, as files finish
+    arguments = (args.calculations, args.chunksize, args.check)
+    if args.workers <= 1:
+        for source, sink in jobs.items():
+            try:
+                yield source, process(source, sink, *arguments)
+            except ERRORS as error:
+                yield source, error
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(process, source, sink, *arguments): source
+            for source, sink in jobs.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            error = future.exception()
+            if error is not None and not isinstance(error, ERRORS):
+                raise error
+            yield futures[future], error or future.result()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="nodc-calc",
+        description=__doc__.split("\n\n")[0].strip(),
+    )
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument(
+        "-c",
+        "--calculations",
+        nargs="+",
+        required=True,
+        help="functions in nodc_calculations.calculate, run in the given order",
+    )
+    parser.add_argument("-o", "--output-dir", required=True, type=pathlib.Path)
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="files processed in parallel"
+    )
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument(
+        "--check",
+        choices=("mtime", "hash"),
+        default="mtime",
+        help="how to decide that an existing output is up to date",
+    )
+    parser.add_argument(
+        "-f", "--force", action="store_true", help="also process up to date files"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        for calculation in args.calculations:
+            pipeline.resolve_step(calculation)
+        sources = _sources(args.inputs)
+    except (ValueError, FileNotFoundError) as error:
+        parser.error(str(error))
+    names = collections.Counter(source.name for source in sources)
+    duplicates = sorted(name for name, count in names.items() if count > 1)
+    if duplicates:
+        parser.error(
+            "Inputs with the same name would be written to the same output: "
+            + ", ".join(duplicates)
+        )
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = {}
+    skipped = 0
+    for source in sources:
+        sink = args.output_dir / source.name
+        if not args.force and up_to_date(source, sink, args.calculations, args.check):
+            skipped += 1
+        else:
+            jobs[source] = sink
+
+    start = time.perf_counter()
+    rows = failed = 0
+    for source, result in _run(jobs, args):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{source}: {result}", file=sys.stderr)
+        else:
+            rows += result
+    seconds = time.perf_counter() - start
+
+    processed = len(jobs) - failed
+    print(
+        f"{processed} files ({rows} rows) processed, {skipped} up to date, "
+        f"{failed} failed in {seconds:.2f} s: "
+        f"{rows / seconds if seconds else 0:.0f} rows/s, "
+        f"{processed / seconds if seconds else 0:.2f} files/s"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,159 @@
+import functools
+from dataclasses import dataclass
+
+import numpy as np
 import pandas as pd
 
+from nodc_calculations import arrays, profiling
+
+# Registry of units. Every unit is converted through µmol/l, the concentration units
+# by a constant factor per parameter and µmol/kg additionally by the density.
+UNITS = ("µmol/l", "ml/l", "mg/l", "µg/l", "µmol/kg")
+MASS_BASED_UNITS = ("µmol/kg",)
+
+
+@dataclass(frozen=True)
+class Parameter:
+    gram_per_mol: float
+    # only for gases
+    umol_per_ml: float | None = None
+
+
+PARAMETERS = {
+    "O2": Parameter(31.9988, arrays.UMOL_PER_ML_OXYGEN),
+    **{
+        nutrient: Parameter(gram_per_mol)
+        for nutrient, gram_per_mol in arrays.GRAM_PER_MOL.items()
+    },
+}
 
-def oxygen_ml2umol(data: pd.DataFrame, oxygen_column_name: str):
-    data.loc[:, f"{oxygen_column_name}_umol"] = (
-        data.loc[:, f"{oxygen_column_name}"] * 44.661
-    )
+
+@dataclass(frozen=True)
+class Conversion:
+    column: str
+    parameter: str
+    from_unit: str
+    to_unit: str
+
+
+@profiling.profiled
+def oxygen_ml2umol(data: pd.DataFrame, oxygen_column_name: str, inplace: bool = True):
+    values = arrays.oxygen_ml2umol(data[oxygen_column_name])
+    if not inplace:
+        return pd.Series(values, index=data.index, name=f"{oxygen_column_name}_umol")
+
+    data.loc[:, f"{oxygen_column_name}_umol"] = values
 
     return data
 
 
+@profiling.profiled
 def gram_per_liter_to_mol_per_liter(
-    data: pd.DataFrame, nutrient: str, incoming_column_name: str, out_column_name
+    data: pd.DataFrame,
+    nutrient: str,
+    incoming_column_name: str,
+    out_column_name,
+    inplace: bool = True,
+):
+    if nutrient not in arrays.GRAM_PER_MOL:
+        return data if inplace else None
+
+    values = arrays.gram_per_liter_to_mol_per_liter(
+        data[incoming_column_name], nutrient
+    )
+    if not inplace:
+        return pd.Series(values, index=data.index, name=out_column_name)
+
+    data.loc[:, out_column_name] = values
+
+    return data
+
+
+def _unit(unit: str) -> str:
+    # accept "umol" and the greek letter mu for the micro sign
+    unit = unit.replace("u", "µ", 1) if unit.startswith("u") else unit
+    unit = unit.replace("\u03bc", "µ")
+    if unit not in UNITS:
+        raise ValueError(f"Unknown unit: {unit!r}")
+    return unit
+
+
+def _umol_per_liter(parameter: str, unit: str) -> float:
+    if parameter not in PARAMETERS:
+        raise ValueError(f"Unknown parameter: {parameter!r}")
+    properties = PARAMETERS[parameter]
+    if unit == "ml/l":
+        if properties.umol_per_ml is None:
+            raise ValueError(f"{parameter} can not be converted from or to ml/l")
+        return properties.umol_per_ml
+    if unit == "mg/l":
+        return 1000 / properties.gram_per_mol
+    if unit == "µg/l":
+        return 1 / properties.gram_per_mol
+    return 1.0
+
+
+@functools.lru_cache(maxsize=None)
+def factor(parameter: str, from_unit: str, to_unit: str) -> float:
+    """
+    Returns the factor converting parameter from from_unit to to_unit, except for
+    the density in conversions from or to µmol/kg
+    """
+    return _umol_per_liter(parameter, _unit(from_unit)) / _umol_per_liter(
+        parameter, _unit(to_unit)
+    )
+
+
+@profiling.profiled
+def convert_units(
+    data: pd.DataFrame,
+    conversions: dict[str, Conversion],
+    density: str = "density",
+    inplace: bool = True,
 ):
- 
-    # molar mass of relevant nutrients
-    gram_per_mol = {
-        "N": 14.006720,
-        "P": 30.973762,
-        "SI": 28.085530,
-    }
+    """
+    Converts several columns in one pass. conversions maps the output column names
+    to Conversions. For conversions from or to µmol/kg the density in kg/m3 is taken
+    from the column density, or calculated from salt, temp and depth if there is no
+    such column. Adds the output columns to data and returns data,
+    or returns only the output columns if inplace is False.
+    """
+    factors = np.array(
+        [
+            factor(conversion.parameter, conversion.from_unit, conversion.to_unit)
+            for conversion in conversions.values()
+        ]
+    )
+    # 1 for conversions from mass based units, -1 for conversions to them
+    exponents = np.array(
+        [
+            (_unit(conversion.from_unit) in MASS_BASED_UNITS)
+            - (_unit(conversion.to_unit) in MASS_BASED_UNITS)
+            for conversion in conversions.values()
+        ]
+    )
 
-    if nutrient not in gram_per_mol:
-        return data
+    with profiling.stage("convert_units.values", data):
+        values = (
+            np.column_stack(
+                [
+                    arrays._values(data[conversion.column])
+                    for conversion in conversions.values()
+                ]
+            )
+            * factors
+        )
+        if exponents.any():
+            if density in data.columns:
+                rho = arrays._values(data[density])
+            else:
+                rho = arrays.density(data.salt, data.temp, data.depth)
+            values *= (rho[:, np.newaxis] / 1000) ** exponents
 
-    # convert g/l to mol/l by dividing with the molar mass
+    if not inplace:
+        return pd.DataFrame(values, index=data.index, columns=list(conversions))
 
-    data.loc[:, out_column_name] = data.loc[:, incoming_column_name] / gram_per_mol[nutrient]
+    with profiling.stage("convert_units.assign", data):
+        data[list(conversions)] = values
 
     return data
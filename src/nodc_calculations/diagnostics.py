@@ -0,0 +1,38 @@
+import logging
+from typing import Callable
+
+import numpy as np
+
+# Diagnostics of the calculations through the logger "nodc_calculations.diagnostics".
+# The branch counts are only calculated when the logger is enabled for DEBUG, e.g.
+#
+#   logging.getLogger("nodc_calculations.diagnostics").setLevel(logging.DEBUG)
+
+logger = logging.getLogger(__name__)
+
+
+def branch_counts(
+    calculation: str, branches: Callable[[], dict[str, np.ndarray]], rows: int
+):
+    """
+    Logs the number of rows in each branch of a selection. branches returns the
+    conditions of the branches, highest priority first, and is only called when
+    DEBUG is enabled. Rows matching no branch are counted as "none".
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
+    counts = {}
+    taken = np.zeros(rows, dtype=bool)
+    for name, condition in branches().items():
+        condition = condition & ~taken
+        counts[name] = int(np.count_nonzero(condition))
+        taken |= condition
+    counts["none"] = rows - int(np.count_nonzero(taken))
+
+    logger.debug(
+        "%s branch counts: %s",
+        calculation,
+        counts,
+        extra={"calculation": calculation, "branch_counts": counts},
+    )
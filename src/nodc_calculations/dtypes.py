@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from nodc_calculations import flags, graph
+
+# Compact storage of station tables. The calculations read float32 columns,
+# categorical flags and flag bitmasks (uint8) as well as the wider defaults,
+# converting them to float64 internally, so a policy can be applied between steps.
+
+# columns added by calculate and convert
+CALCULATED = tuple(graph.PRODUCERS)
+
+
+def _calculated(column) -> bool:
+    return column in CALCULATED or str(column).endswith("_umol")
+
+
+@dataclass(frozen=True)
+class DtypePolicy:
+    """
+    floats is the dtype of the float columns selected by float_columns: "calculated"
+    for the columns added by calculate and convert, "all" for every float64 column
+    or a tuple of column names. flags is "category", "uint8" for the bitmasks of
+    flags.encode, which keeps only the characters the calculations use, or None to
+    keep the flags as they are. The columns in drop, e.g. NTRZ_corrected, are
+    removed.
+
+    A policy is a valid step in pipeline.run_pipeline and pipeline.stream. The
+    bitmasks can not be turned back into the flags and are for use in memory
+    only. pipeline.ChunkWriter refuses to write them.
+    """
+
+    floats: str | None = "float32"
+    float_columns: str | tuple[str, ...] = "calculated"
+    flags: str | None = "category"
+    drop: tuple[str, ...] = ()
+
+    def __post_init__(self):
+        if self.flags not in ("category", "uint8", None):
+            raise ValueError(f"Unknown flag dtype: {self.flags!r}")
+
+    def _float_columns(self, df: pd.DataFrame) -> list:
+        if isinstance(self.float_columns, tuple):
+            return [column for column in self.float_columns if column in df.columns]
+        if self.float_columns not in ("calculated", "all"):
+            raise ValueError(f"Unknown float columns: {self.float_columns!r}")
+        return [
+            column
+            for column, dtype in df.dtypes.items()
+            if dtype == np.float64
+            and (self.float_columns == "all" or _calculated(column))
+        ]
+
+    def apply(self, df: pd.DataFrame, inplace: bool = True) -> pd.DataFrame:
+        """
+        Converts the columns of df according to the policy and returns df,
+        or a converted copy if inplace is False
+        """
+        if not inplace:
+            df = df.copy()
+        df.drop(
+            columns=[column for column in self.drop if column in df.columns],
+            inplace=True,
+        )
+        if self.floats is not None:
+            for column in self._float_columns(df):
+                df[column] = df[column].astype(self.floats)
+        if self.flags is not None:
+            for column in df.columns:
+                if not str(column).startswith("Q_"):
+                    continue
+                if self.flags == "uint8":
+                    if df[column].dtype != np.uint8:
+                        df[column] = flags.encode(df[column])
+                else:
+                    df[column] = df[column].astype("category")
+        return df
+
+    __call__ = apply
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns dtype and memory use in bytes, including the contents of strings,
+    of every column in df, largest first
+    """
+    report = pd.DataFrame(
+        {
+            "dtype": df.dtypes.astype(str),
+            "bytes": df.memory_usage(index=False, deep=True),
+        }
+    )
+    report.index.name = "column"
+    return report.sort_values("bytes", ascending=False)
@@ -0,0 +1,116 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+# one bit per quality flag character that the calculations care about
+BITS = {
+    "3": np.uint8(1 << 0),
+    "4": np.uint8(1 << 1),
+    "6": np.uint8(1 << 2),
+    "B": np.uint8(1 << 3),
+    "S": np.uint8(1 << 4),
+    "<": np.uint8(1 << 5),
+    "Z": np.uint8(1 << 6),
+    ">": np.uint8(1 << 7),
+}
+
+# commonly used flag classes
+REJECTED = "43BS"
+BELOW_DETECTION = "6<"
+
+
+def mask(characters: str) -> np.uint8:
+    """
+    Returns the bitmask for a set of flag characters, e.g. "43BS"
+    """
+    result = np.uint8(0)
+    for character in characters:
+        if character not in BITS:
+            raise ValueError(f"Unknown quality flag character: {character!r}")
+        result |= BITS[character]
+    return result
+
+
+@functools.lru_cache(maxsize=1024)
+def _decode(flag: str) -> np.uint8:
+    bits = np.uint8(0)
+    for character in flag:
+        bits |= BITS.get(character, 0)
+    return bits
+
+
+def _arrow_dictionary(array):
+    import pyarrow as pa
+
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if not pa.types.is_dictionary(array.type):
+        array = array.dictionary_encode()
+    codes = array.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+    return codes, array.dictionary.to_pylist()
+
+
+def factorize(flags) -> tuple[np.ndarray, list]:
+    """
+    Returns integer codes and the distinct flags of a Q_ column. Categorical and Arrow
+    dictionary encoded columns are used as they are, plain strings are factorized.
+    Arrow and Polars columns are dictionary encoded with Arrow.
+    Missing flags get code -1.
+    """
+    if type(flags).__module__.startswith("pyarrow"):
+        return _arrow_dictionary(flags)
+    if type(flags).__module__.startswith("polars"):
+        return _arrow_dictionary(flags.to_arrow())
+    flags = pd.Series(flags)
+    if isinstance(flags.dtype, pd.CategoricalDtype):
+        return flags.cat.codes.to_numpy(), list(flags.cat.categories)
+    if isinstance(flags.dtype, pd.ArrowDtype):
+        return _arrow_dictionary(flags.array.__arrow_array__())
+    codes, categories = pd.factorize(flags)
+    return codes, list(categories)
+
+
+def encode(flags) -> np.ndarray:
+    """
+    Decodes a Q_ column into a uint8 array with one bit set for every flag character
+    in BITS that occurs anywhere in the flag string. Each distinct flag is decoded
+    once and broadcast to the rows through its codes. Missing flags give 0.
+    """
+    codes, categories = factorize(flags)
+    # the trailing 0 is picked up by the -1 code of missing flags
+    table = np.array(
+        [_decode(str(category)) for category in categories] + [0], dtype=np.uint8
+    )
+    return table[codes]
+
+
+def categorize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a copy of df with all Q_ columns converted to categoricals
+    """
+    columns = [column for column in df.columns if str(column).startswith("Q_")]
+    return df.astype({column: "category" for column in columns})
+
+
+def any_of(bits: np.ndarray, characters: str) -> np.ndarray:
+    """
+    True where any of the given flag characters is set
+    """
+    return (bits & mask(characters)) != 0
+
+
+def valid(values, bits: np.ndarray, rejected: str = REJECTED) -> np.ndarray:
+    """
+    True where there is a value and none of the rejected flag characters is set
+    """
+    return ~pd.isna(np.asarray(values)) & ~any_of(bits, rejected)
+
+
+def below_detection(
+    values, bits: np.ndarray, characters: str = BELOW_DETECTION
+) -> np.ndarray:
+    """
+    True where there is a value flagged as below detection limit
+    """
+    return ~pd.isna(np.asarray(values)) & any_of(bits, characters)
@@ -0,0 +1,241 @@
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from nodc_calculations import arrays
+
+# Dependency graph of the derived parameters. Every node declares the columns it
+# reads and the columns it produces. compute() works out which nodes are needed for
+# the requested outputs, skips the ones whose outputs are already columns in the
+# frame and runs the rest once each in dependency order.
+
+
+@dataclass(frozen=True)
+class Node:
+    outputs: tuple[str, ...]
+    inputs: tuple[str, ...]
+    function: Callable
+    # inputs that are passed as None when the column is missing
+    optional: tuple[str, ...] = ()
+
+
+NODES = (
+    Node(
+        ("pressure",),
+        ("depth", "latitude"),
+        lambda depth, latitude: arrays.pressure(
+            depth, arrays.LATITUDE if latitude is None else latitude
+        ),
+        optional=("latitude",),
+    ),
+    Node(("potential_temperature",), ("salt", "temp"), arrays.potential_temperature),
+    Node(
+        ("density",),
+        ("salt", "temp", "pressure"),
+        lambda salt, temp, p: arrays.density(salt, temp, None, p=p),
+    ),
+    Node(
+        ("oxygen_solubility",),
+        ("salt", "potential_temperature", "density"),
+        lambda salt, pt, density: arrays.oxygen_solubility(salt, None, density, pt=pt),
+    ),
+    Node(
+        ("oxygen",),
+        ("DOXY_BTL", "Q_DOXY_BTL", "DOXY_CTD", "Q_DOXY_CTD", "H2S", "Q_H2S"),
+        arrays.oxygen,
+        optional=("H2S", "Q_H2S"),
+    ),
+    Node(
+        ("oxygen_saturation",),
+        ("oxygen", "oxygen_solubility"),
+        arrays.oxygen_saturation,
+    ),
+    Node(("aou",), ("oxygen", "oxygen_solubility"), arrays.apparent_oxygen_utilization),
+    Node(("oxygen_umol_kg",), ("oxygen", "density"), arrays.oxygen_ml2umol_per_kg),
+    Node(
+        ("oxygen_solubility_umol_kg",),
+        ("oxygen_solubility", "density"),
+        arrays.oxygen_ml2umol_per_kg,
+    ),
+    Node(("aou_umol_kg",), ("aou", "density"), arrays.oxygen_ml2umol_per_kg),
+    Node(
+        ("NTRZ_corrected", "din"),
+        tuple(
+            column
+            for parameter in ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL")
+            for column in (parameter, f"Q_{parameter}")
+        ),
+        arrays.din,
+    ),
+)
+
+PRODUCERS = {output: node for node in NODES for output in node.outputs}
+
+
+def _resolve(columns: Iterable[str], outputs: Iterable[str]):
+    columns = set(columns)
+    nodes = []
+    missing = []
+    visited = set()
+
+    def visit(name):
+        if name in columns or name in visited:
+            return
+        visited.add(name)
+        node = PRODUCERS.get(name)
+        if node is None:
+            missing.append(name)
+            return
+        for column in node.inputs:
+            if column in node.optional and column not in columns:
+                continue
+            visit(column)
+        if node not in nodes:
+            nodes.append(node)
+
+    for output in outputs:
+        if output not in PRODUCERS:
+            raise ValueError(f"Unknown parameter: {output!r}")
+        visit(output)
+    return nodes, missing
+
+
+def missing_inputs(columns: Iterable[str], outputs: Iterable[str]) -> list[str]:
+    """
+    Returns the input columns needed for outputs that are not among columns
+    """
+    return _resolve(columns, outputs)[1]
+
+
+def plan(columns: Iterable[str], outputs: Iterable[str]) -> list[Node]:
+    """
+    Returns the nodes that have to run, in order, to add outputs to a frame with the
+    given columns. Raises ValueError listing all missing input columns.
+    """
+    nodes, missing = _resolve(columns, outputs)
+    if missing:
+        raise ValueError(f"Missing input columns: {', '.join(missing)}")
+    return nodes
+
+
+def compute(df: pd.DataFrame, outputs: Iterable[str]) -> pd.DataFrame:
+    """
+    Adds the requested outputs, and the intermediate parameters they need, as columns
+    to df and returns df. Parameters that are already columns are not recalculated,
+    so repeated calls on the same frame only compute what is new.
+    """
+    for node in plan(df.columns, outputs):
+        results = node.function(
+            *(df[column] if column in df.columns else None for column in node.inputs)
+        )
+        if len(node.outputs) == 1:
+            results = (results,)
+        for column, values in zip(node.outputs, results):
+            df[column] = values
+    return df
+
+
+def _given(columns: Iterable[str]) -> set[str]:
+    # the columns that are inputs: parameters not produced by any node and produced
+    # parameters that can not be calculated from the other columns
+    columns = set(columns)
+    given = {column for column in columns if column not in PRODUCERS}
+    available = set(given)
+    # NODES are in dependency order
+    for node in NODES:
+        if set(node.inputs) - set(node.optional) <= available:
+            available.update(node.outputs)
+        else:
+            given.update(columns.intersection(node.outputs))
+            available.update(columns.intersection(node.outputs))
+    return given
+
+
+def _match(df: pd.DataFrame, delta: pd.DataFrame, on: list[str] | None) -> np.ndarray:
+    # positions in df of the rows of delta, -1 for new rows
+    if on is None:
+        if not df.index.is_unique or not delta.index.is_unique:
+            raise ValueError("Keys have to be unique in both df and delta")
+        return df.index.get_indexer(delta.index)
+
+    # only the rows of df with keys in delta are indexed, the index of a whole
+    # archive costs more than the update itself
+    candidates = np.ones(len(df), dtype=bool)
+    for column in on:
+        candidates &= df[column].isin(delta[column]).to_numpy()
+    candidates = np.flatnonzero(candidates)
+    keys = pd.MultiIndex.from_frame(df.iloc[candidates][on])
+    delta_keys = pd.MultiIndex.from_frame(delta[on])
+    if not keys.is_unique or not delta_keys.is_unique:
+        raise ValueError("Keys have to be unique in both df and delta")
+    positions = keys.get_indexer(delta_keys)
+    return np.where(positions >= 0, candidates[positions], -1)
+
+
+def _set(df: pd.DataFrame, column: str, positions: np.ndarray, values: pd.Series):
+    # writes values to the rows at positions, the column is only converted if its
+    # dtype can not hold the values
+    if column not in df.columns:
+        values = pd.Series(values.to_numpy(), index=positions)
+        df[column] = values.reindex(range(len(df))).set_axis(df.index)
+        return
+    index = df.columns.get_loc(column)
+    try:
+        df.iloc[positions, index] = values.to_numpy()
+    except TypeError:
+        dtype = pd.concat([df[column].iloc[:0], values.iloc[:0]]).dtype
+        df[column] = df[column].astype(dtype)
+        df.iloc[positions, index] = values.to_numpy()
+
+
+def update(
+    df: pd.DataFrame,
+    delta: pd.DataFrame,
+    outputs: Iterable[str],
+    on: str | list[str] | None = None,
+    inplace: bool = False,
+) -> pd.DataFrame:
+    """
+    Returns df, a frame with calculated outputs, with the rows of delta merged in.
+    Rows are matched on the columns on, or on the index if on is None. Matching rows
+    get the values of the columns in delta, the other rows of delta are appended.
+    The outputs, and the intermediate parameters they need, are only recalculated
+    for the rows in delta and written by position. df is copied unless inplace is
+    True, then the cost only grows with the size of delta as long as no rows are
+    appended.
+    """
+    on = [on] if isinstance(on, str) else on
+    positions = _match(df, delta, None if on is None else list(on))
+    existing = positions >= 0
+
+    # complete the rows of delta with the columns from df, missing for new rows
+    columns = list(dict.fromkeys([*df.columns, *delta.columns]))
+    # rows before columns, a selection of columns copies them in full
+    known = df.iloc[positions[existing]][
+        df.columns.difference(delta.columns, sort=False)
+    ]
+    known.index = np.flatnonzero(existing)
+    rows = pd.concat(
+        [delta.reset_index(drop=True), known.reindex(range(len(delta)))], axis=1
+    )[columns]
+    inputs = _given(columns)
+    given = [column for column in columns if column in inputs]
+    calculated = compute(rows[given].copy(), outputs)
+    recalculated = calculated.columns.difference(given, sort=False)
+    for column in recalculated:
+        rows[column] = calculated[column]
+    rows.index = delta.index
+
+    # only the columns that can have changed are written, a write to a pyarrow
+    # backed string column copies the whole column
+    result = df if inplace else df.copy()
+    for column in dict.fromkeys([*delta.columns, *recalculated]):
+        _set(result, column, positions[existing], rows[column][existing])
+    if existing.all():
+        return result
+    return pd.concat(
+        [result, rows[~existing]],
+        ignore_index=on is not None and isinstance(df.index, pd.RangeIndex),
+    )
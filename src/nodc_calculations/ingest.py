@@ -0,0 +1,135 @@
+import asyncio
+import concurrent.futures
+import pathlib
+from typing import Iterable
+
+from nodc_calculations import pipeline
+
+# Asyncio ingestion of many files, where reading and parsing the next chunks overlaps
+# with the calculations on the previous ones and with writing the results.
+#
+#   readers -> chunks queue -> calculations -> results queue -> writer
+#
+# Readers parse the files chunk by chunk in a thread pool and put the chunks on a
+# bounded queue. The calculations are started in order as chunks arrive, in a thread
+# or a process pool, and their futures are put on a second bounded queue which the
+# writer awaits in order. When a queue is full the stage before it waits, so at most
+# queue_size + 2 * workers + readers + 1 chunks are held in memory, whatever the size
+# and number of the files. The chunks of a file are written in the order they are
+# read, so every output is identical to the one written by pipeline.stream.
+
+_DONE = object()
+
+
+async def _read(
+    sources: asyncio.Queue,
+    chunks: asyncio.Queue,
+    pool: concurrent.futures.Executor,
+    chunksize: int,
+    sep: str | None,
+):
+    loop = asyncio.get_running_loop()
+    while not sources.empty():
+        source = sources.get_nowait()
+        iterator = pipeline.read_chunks(source, chunksize=chunksize, sep=sep)
+        while True:
+            chunk = await loop.run_in_executor(pool, next, iterator, None)
+            if chunk is None:
+                break
+            await chunks.put((source, chunk))
+        # marks the end of the file for the writer
+        await chunks.put((source, None))
+
+
+async def _calculate(
+    chunks: asyncio.Queue,
+    results: asyncio.Queue,
+    pool: concurrent.futures.Executor,
+    steps: list[pipeline.Step],
+):
+    loop = asyncio.get_running_loop()
+    while (item := await chunks.get()) is not _DONE:
+        source, chunk = item
+        if chunk is not None:
+            chunk = loop.run_in_executor(pool, pipeline.apply_steps, chunk, steps)
+        await results.put((source, chunk))
+    await results.put(_DONE)
+
+
+async def _write(
+    results: asyncio.Queue,
+    pool: concurrent.futures.Executor,
+    jobs: dict,
+    sep: str | None,
+) -> dict[pathlib.Path, int]:
+    loop = asyncio.get_running_loop()
+    writers = {}
+    rows = {}
+    try:
+        while (item := await results.get()) is not _DONE:
+            source, future = item
+            if future is None:
+                writer = writers.pop(source, None)
+                if writer is not None:
+                    await loop.run_in_executor(pool, writer.close)
+                rows[source] = 0 if writer is None else writer.rows
+                continue
+            chunk = await future
+            if source not in writers:
+                writers[source] = pipeline.ChunkWriter(jobs[source], sep=sep)
+            await loop.run_in_executor(pool, writers[source].write, chunk)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return rows
+
+
+async def ingest(
+    jobs: dict | Iterable[tuple],
+    steps: Iterable[pipeline.Step],
+    chunksize: int = 100_000,
+    sep: str | None = None,
+    readers: int = 2,
+    workers: int = 1,
+    executor: str = "thread",
+    queue_size: int = 4,
+) -> dict[pathlib.Path, int]:
+    """
+    Applies the steps to every source file and writes the results to its sink, with
+    the reading, calculating and writing of different chunks running at the same
+    time. jobs maps source to sink paths. readers files are read at a time, and
+    workers chunks are calculated at a time in a thread pool, or a process pool if
+    executor is "process". Returns the number of rows written per source.
+
+        rows = asyncio.run(ingest({"a.txt": "out/a.txt"}, ["oxygen"]))
+    """
+    jobs = {pathlib.Path(source): sink for source, sink in dict(jobs).items()}
+    steps = list(steps)
+    for step in steps:
+        pipeline.resolve_step(step)
+
+    sources = asyncio.Queue()
+    for source in jobs:
+        sources.put_nowait(source)
+    chunks = asyncio.Queue(maxsize=queue_size)
+    results = asyncio.Queue(maxsize=max(workers, 1))
+
+    io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=readers + 1)
+    calculation_pool = pipeline._pool(max(workers, 1), executor)
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [
+                group.create_task(_read(sources, chunks, io_pool, chunksize, sep))
+                for _ in range(max(min(readers, len(jobs)), 1))
+            ]
+            group.create_task(_calculate(chunks, results, calculation_pool, steps))
+            writer = group.create_task(_write(results, io_pool, jobs, sep))
+            await asyncio.gather(*tasks)
+            await chunks.put(_DONE)
+    except ExceptionGroup as errors:
+        # the first failure, the other tasks are cancelled because of it
+        raise errors.exceptions[0] from None
+    finally:
+        calculation_pool.shutdown(cancel_futures=True)
+        io_pool.shutdown(cancel_futures=True)
+    return writer.result()
@@ -0,0 +1,126 @@
+# Optional compiled kernels. If numba is installed the row loops below, and the loops
+# that rules.compile generates, are compiled, otherwise the calculations in arrays.py
+# use their NumPy implementations.
+# numba is slow to import, so it is imported, and the loops compiled, on first access
+# of kernels.numba or one of the compiled loops.
+
+import hashlib
+import importlib.util
+import os
+import sys
+
+import numpy as np
+
+from nodc_calculations import _cache
+
+
+# compiled loops and the loops they are compiled from
+_COMPILED = {
+    "_bilinear_compiled": "_bilinear_loop",
+    "_trilinear_compiled": "_trilinear_loop",
+}
+
+
+def __getattr__(name):
+    if name == "numba":
+        try:
+            import numba
+        except ImportError:
+            numba = None
+        globals()["numba"] = numba
+        return numba
+    if name in _COMPILED:
+        numba = _get("numba")
+        compiled = numba and numba.njit(cache=True, nogil=True)(
+            globals()[_COMPILED[name]]
+        )
+        globals()[name] = compiled
+        return compiled
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _get(name):
+    # module attributes from inside the module, where __getattr__ is not used
+    return globals()[name] if name in globals() else __getattr__(name)
+
+
+def compile_source(source: str, name: str):
+    """
+    Compiles the function name in generated source code with numba. The source is
+    written to a module in the cache directory, so that numba can cache the machine
+    code between processes.
+    """
+    digest = hashlib.sha1(source.encode()).hexdigest()[:20]
+    path = _cache.default_cache_dir() / "kernels" / f"generated_{digest}.py"
+    try:
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_text(source)
+            os.replace(temporary, path)
+        spec = importlib.util.spec_from_file_location(f"_generated_{digest}", path)
+        module = importlib.util.module_from_spec(spec)
+        # numba imports the module by name when it loads the cached code
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+        function, cache = getattr(module, name), True
+    except OSError:
+        namespace = {}
+        exec(source, namespace)
+        function, cache = namespace[name], False
+    return _get("numba").njit(cache=cache, nogil=True)(function)
+
+
+def _bilinear_loop(table, x0, dx, y0, dy, x, y, out):
+    nx, ny = table.shape
+    for k in range(x.shape[0]):
+        u = (x[k] - x0) / dx
+        v = (y[k] - y0) / dy
+        i = min(int(u), nx - 2)
+        j = min(int(v), ny - 2)
+        fu = u - i
+        fv = v - j
+        c0 = table[i, j] + fv * (table[i, j + 1] - table[i, j])
+        c1 = table[i + 1, j] + fv * (table[i + 1, j + 1] - table[i + 1, j])
+        out[k] = c0 + fu * (c1 - c0)
+
+
+def _trilinear_loop(table, x0, dx, y0, dy, z0, dz, x, y, z, out):
+    nx, ny, nz = table.shape
+    for k in range(x.shape[0]):
+        u = (x[k] - x0) / dx
+        v = (y[k] - y0) / dy
+        w = (z[k] - z0) / dz
+        i = min(int(u), nx - 2)
+        j = min(int(v), ny - 2)
+        m = min(int(w), nz - 2)
+        fu = u - i
+        fv = v - j
+        fw = w - m
+        c00 = table[i, j, m] + fw * (table[i, j, m + 1] - table[i, j, m])
+        c01 = table[i, j + 1, m] + fw * (table[i, j + 1, m + 1] - table[i, j + 1, m])
+        c10 = table[i + 1, j, m] + fw * (table[i + 1, j, m + 1] - table[i + 1, j, m])
+        c11 = table[i + 1, j + 1, m] + fw * (
+            table[i + 1, j + 1, m + 1] - table[i + 1, j + 1, m]
+        )
+        c0 = c00 + fv * (c01 - c00)
+        c1 = c10 + fv * (c11 - c10)
+        out[k] = c0 + fu * (c1 - c0)
+
+
+def interpolate(table, grids, *points):
+    """
+    Linear interpolation in a 2-D or 3-D table on a regular grid, grids holds
+    (start, step, size) for each axis. All points must lie within the grid.
+    Only available when numba is installed.
+    """
+    out = np.empty(len(points[0]), dtype=np.float64)
+    points = [np.ascontiguousarray(point, dtype=np.float64) for point in points]
+    spacing = [
+        value for start, step, _ in grids for value in (float(start), float(step))
+    ]
+    if table.ndim == 2:
+        _get("_bilinear_compiled")(table, *spacing, *points, out)
+    else:
+        _get("_trilinear_compiled")(table, *spacing, *points, out)
+    return out
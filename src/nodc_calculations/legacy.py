@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from nodc_calculations import arrays, flags
+
+# Vectorized version of calculate._get_DIN, the DIN definition from sharktoolbox,
+# for comparison with calculate.dissolved_inorganic_nitrogen on full datasets.
+# As in _get_DIN only the part of a flag before "_" is used and it has to match
+# exactly, e.g. "4_0" is rejected but "1_4" is not.
+
+DIN_INPUTS = ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL")
+
+
+def _primary_in(q, values: tuple[str, ...]) -> np.ndarray:
+    codes, categories = flags.factorize(q)
+    # the trailing False is picked up by the -1 code of missing flags
+    table = np.array(
+        [str(category).split("_")[0] in values for category in categories] + [False]
+    )
+    return table[codes]
+
+
+def din(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns DIN according to calculate._get_DIN for every row of df, and the branch
+    taken: "h2s", "low_oxygen", "ntrz" or "ntra_ntri"
+    """
+    ntra, ntri, ntrz, amon, h2s, doxy = (arrays._values(df[p]) for p in DIN_INPUTS)
+    q_ntra_rejected = _primary_in(df.Q_NTRA, ("4", "3"))
+    q_amon_rejected = _primary_in(df.Q_AMON, ("4", "3"))
+    q_amon_included = ~_primary_in(df.Q_AMON, ("6", "4", "3"))
+
+    h2s_branch = ~np.isnan(h2s) & (
+        ~_primary_in(df.Q_H2S, ("6", "4", "3"))
+        | (_primary_in(df.Q_H2S, ("6",)) & _primary_in(df.Q_NTRA, ("4", "6", "3")))
+    )
+    low_oxygen_branch = ~h2s_branch & (
+        (doxy < 2.0) & ~_primary_in(df.Q_DOXY_BTL, ("4", "3"))
+    )
+
+    # DIN from NTRZ or from NTRA + NTRI, plus AMON when it is above detection limit
+    with np.errstate(invalid="ignore"):
+        add_amon = ~np.isnan(amon) & q_amon_included
+        from_parts = np.where(q_ntra_rejected, np.nan, ntra)
+        from_parts = np.where(np.isnan(ntri), from_parts, from_parts + ntri)
+        from_parts = np.where(add_amon, from_parts + amon, from_parts)
+        from_ntrz = np.where(add_amon, ntrz + amon, ntrz)
+    nitrogen = np.where(np.isnan(ntrz), from_parts, from_ntrz)
+
+    no_amon = np.isnan(amon) | q_amon_rejected
+    result = np.select(
+        [h2s_branch, low_oxygen_branch],
+        [np.where(no_amon, np.nan, amon), np.where(no_amon, np.nan, nitrogen)],
+        nitrogen,
+    )
+    branch = np.select(
+        [h2s_branch, low_oxygen_branch, np.isnan(ntrz)],
+        ["h2s", "low_oxygen", "ntra_ntri"],
+        "ntrz",
+    )
+    return result, branch
+
+
+def compare_din(df: pd.DataFrame, atol: float = 0.0) -> pd.DataFrame:
+    """
+    Calculates DIN with calculate.dissolved_inorganic_nitrogen and with the legacy
+    definition and returns the rows where they differ by more than atol, or where
+    only one of them is missing. The report has the columns din, din_branch,
+    legacy_din and legacy_branch and the index of df. Branches of din are named as
+    in the diagnostics of arrays.din.
+    """
+    arguments = [
+        function(df[column])
+        for parameter in DIN_INPUTS
+        for column, function in (
+            (parameter, arrays._values),
+            (f"Q_{parameter}", arrays._bits),
+        )
+    ]
+    ntrz_corrected, result = arrays.din(*arguments)
+    branches = arrays._din_branches(ntrz_corrected, *arguments)
+    branch = np.select(list(branches.values()), list(branches), "none")
+    legacy_result, legacy_branch = din(df)
+
+    differs = np.isnan(result) != np.isnan(legacy_result)
+    with np.errstate(invalid="ignore"):
+        differs |= np.abs(result - legacy_result) > atol
+    return pd.DataFrame(
+        {
+            "din": result[differs],
+            "din_branch": pd.Categorical(branch[differs]),
+            "legacy_din": legacy_result[differs],
+            "legacy_branch": pd.Categorical(legacy_branch[differs]),
+        },
+        index=df.index[differs],
+    )
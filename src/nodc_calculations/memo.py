@@ -0,0 +1,151 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# The entries of a function are kept in flat arrays: a 64 bit hash of every input
+# combination, the inputs themselves as integer bit patterns, the result and when
+# the entry was last used. The rows of a call are hashed and looked up together in
+# a hash table on the entry hashes, and the inputs of the found entries are compared
+# to rule out hash collisions. Only the distinct combinations that are not found
+# are evaluated and appended.
+
+
+class _Entries:
+    def __init__(self, width: int):
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.keys = np.empty((width, 0), dtype=np.uint64)
+        self.values = np.empty(0, dtype=np.float64)
+        self.used = np.empty(0, dtype=np.int64)
+        self.index = pd.Index(self.hashes)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def lookup(self, hashes: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        # position of every row in the entries, -1 if not found
+        positions = self.index.get_indexer(hashes)
+        if not len(self):
+            return positions
+        found = positions >= 0
+        for stored, key in zip(self.keys, keys):
+            found &= stored[positions] == key
+        return np.where(found, positions, -1)
+
+    def add(self, hashes, keys, values, used):
+        # a hash that is already used by other inputs is left out
+        new = self.index.get_indexer(hashes) < 0
+        self.hashes = np.concatenate([self.hashes, hashes[new]])
+        self.keys = np.concatenate([self.keys, keys[:, new]], axis=1)
+        self.values = np.concatenate([self.values, values[new]])
+        self.used = np.concatenate([self.used, np.full(new.sum(), used)])
+        self.index = pd.Index(self.hashes)
+
+    def evict(self, maxsize: int):
+        # keeps the maxsize most recently used entries
+        keep = np.sort(np.argpartition(-self.used, maxsize - 1)[:maxsize])
+        self.hashes = self.hashes[keep]
+        self.keys = self.keys[:, keep]
+        self.values = self.values[keep]
+        self.used = self.used[keep]
+        self.index = pd.Index(self.hashes)
+
+
+class SeawaterCache:
+    """
+    Memoizes the TEOS-10 functions used by density and oxygen_solubility. Pass an
+    instance as backend to the functions in arrays or calculate.
+
+    With decimals=None the inputs are used exactly as keys. Otherwise the inputs are
+    rounded to that many decimals and the functions are evaluated at the rounded
+    values, so that nearby rows share one entry. At most maxsize entries per
+    function are kept, the least recently used ones are evicted first, about 60 MB
+    per million entries. hits and misses count rows.
+    """
+
+    def __init__(self, maxsize: int = 1_000_000, decimals: int | None = None):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def pot_rho_t_exact(self, SA, t, p, p_ref):
+        import gsw
+
+        return self._call(
+            ("pot_rho_t_exact", p_ref),
+            lambda SA, t, p: gsw.pot_rho_t_exact(SA, t, p, p_ref),
+            SA,
+            t,
+            p,
+        )
+
+    def O2sol_SP_pt(self, SP, pt):
+        import gsw
+
+        return self._call(("O2sol_SP_pt",), gsw.O2sol_SP_pt, SP, pt)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": sum(len(entries) for entries in self._entries.values()),
+            "maxsize": self.maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _call(self, name, function, *args):
+        args = np.broadcast_arrays(*(np.asarray(arg, dtype=np.float64) for arg in args))
+        shape = args[0].shape
+        # one row per argument
+        inputs = np.stack([arg.ravel() for arg in args])
+        if self.decimals is not None:
+            inputs = np.round(inputs, self.decimals)
+        # + 0.0 turns -0.0 into 0.0, which would otherwise be a different key
+        inputs += 0.0
+        keys = inputs.view(np.uint64)
+        hashes = pd.util.hash_array(keys[0])
+        for key in keys[1:]:
+            hashes = hashes * np.uint64(1_000_003) ^ pd.util.hash_array(key)
+
+        with self._lock:
+            self._calls += 1
+            entries = self._entries.setdefault(name, _Entries(len(keys)))
+            positions = entries.lookup(hashes, keys)
+            found = positions >= 0
+            hits = int(found.sum())
+            if hits:
+                results = entries.values[positions]
+                entries.used[positions[found]] = self._calls
+            else:
+                results = np.empty(len(hashes), dtype=np.float64)
+            self.hits += hits
+            self.misses += len(hashes) - hits
+
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            # every distinct missing combination is evaluated once
+            codes, distinct = pd.factorize(hashes[missing])
+            first = np.empty(len(distinct), dtype=np.intp)
+            first[codes[::-1]] = missing[::-1]
+            computed = np.asarray(function(*inputs[:, first]), dtype=np.float64).ravel()
+            results[missing] = computed[codes]
+            # rows that only share the hash with the first row are evaluated apart
+            other = missing[(keys[:, missing] != keys[:, first[codes]]).any(axis=0)]
+            if len(other):
+                results[other] = np.asarray(function(*inputs[:, other])).ravel()
+            with self._lock:
+                entries.add(distinct, keys[:, first], computed, self._calls)
+                if len(entries) > self.maxsize:
+                    entries.evict(self.maxsize)
+
+        return results.reshape(shape)
@@ -0,0 +1,215 @@
+import concurrent.futures
+import itertools
+import pathlib
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from nodc_calculations import calculate
+
+# A step is a function from calculate, either given by name or as a callable that
+# takes a DataFrame and adds its result columns to it, e.g. a functools.partial of
+# one of the functions in convert.
+Step = str | Callable[[pd.DataFrame], object]
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+TAB_SUFFIXES = (".txt", ".tsv")
+
+
+def resolve_step(step: Step) -> Callable[[pd.DataFrame], object]:
+    if callable(step):
+        return step
+    function = getattr(calculate, step, None)
+    if function is None or step.startswith("_"):
+        raise ValueError(f"Unknown calculation: {step!r}")
+    return function
+
+
+def apply_steps(df: pd.DataFrame, steps: Iterable[Step]) -> pd.DataFrame:
+    """
+    Runs the steps in order on df, adding their result columns, and returns df
+    """
+    for step in steps:
+        resolve_step(step)(df)
+    return df
+
+
+def _pool(workers: int, executor: str) -> concurrent.futures.Executor:
+    if executor == "process":
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    if executor == "thread":
+        return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown executor: {executor!r}")
+
+
+def _map_blocks(
+    pool: concurrent.futures.Executor, df: pd.DataFrame, steps: list[Step], blocks: int
+) -> pd.DataFrame:
+    bounds = np.linspace(0, len(df), min(blocks, len(df)) + 1).astype(int)
+    parts = (df.iloc[start:stop].copy() for start, stop in itertools.pairwise(bounds))
+    return pd.concat(pool.map(apply_steps, parts, itertools.repeat(steps)))
+
+
+def run_pipeline(
+    df: pd.DataFrame,
+    steps: Iterable[Step],
+    workers: int = 1,
+    executor: str = "thread",
+) -> pd.DataFrame:
+    """
+    Runs the steps on a copy of df and returns it. With more than one worker the
+    rows are split into one block per worker which are processed in a thread pool,
+    or a process pool if executor is "process", and put together in the original
+    order. The compiled kernels and most NumPy functions release the GIL. A process
+    pool has to pickle every block, including the Q_ strings, in the calling
+    process, which only pays off for steps that hold the GIL. Steps given by name
+    are the cheapest to send to worker processes.
+    """
+    steps = list(steps)
+    for step in steps:
+        resolve_step(step)
+    if workers <= 1 or len(df) < 2:
+        return apply_steps(df.copy(), steps)
+
+    with _pool(workers, executor) as pool:
+        return _map_blocks(pool, df, steps, workers)
+
+
+def _separator(path: pathlib.Path, sep: str | None) -> str:
+    if sep is not None:
+        return sep
+    return "\t" if path.suffix.lower() in TAB_SUFFIXES else ","
+
+
+def _floats(chunk: pd.DataFrame) -> pd.DataFrame:
+    # an integer column becomes float64 in the chunks where it has a gap, so it is
+    # float64 in every chunk
+    integers = [
+        column
+        for column, dtype in chunk.dtypes.items()
+        if dtype.kind in "iu" and not str(column).startswith("Q_")
+    ]
+    return chunk.astype(dict.fromkeys(integers, np.float64)) if integers else chunk
+
+
+def read_chunks(
+    source, chunksize: int = 100_000, sep: str | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads a CSV, tab separated (e.g. SHARK export) or Parquet file in chunks of
+    chunksize rows. Q_ columns are always read as strings and numeric columns as
+    float64, so that the dtypes do not depend on which rows are in a chunk.
+    """
+    source = pathlib.Path(source)
+    if source.suffix.lower() in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield _floats(batch.to_pandas())
+        return
+
+    sep = _separator(source, sep)
+    columns = pd.read_csv(source, sep=sep, nrows=0).columns
+    chunks = pd.read_csv(
+        source,
+        sep=sep,
+        chunksize=chunksize,
+        dtype={column: str for column in columns if column.startswith("Q_")},
+    )
+    for chunk in chunks:
+        yield _floats(chunk)
+
+
+class ChunkWriter:
+    """
+    Writes chunks to a CSV, tab separated or Parquet file as they arrive.
+    Use as a context manager.
+    """
+
+    def __init__(self, sink, sep: str | None = None):
+        self.path = pathlib.Path(sink)
+        self.sep = _separator(self.path, sep)
+        self.rows = 0
+        self._parquet = self.path.suffix.lower() in PARQUET_SUFFIXES
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, chunk: pd.DataFrame):
+        encoded = [
+            column
+            for column, dtype in chunk.dtypes.items()
+            if str(column).startswith("Q_") and dtype == np.uint8
+        ]
+        if encoded:
+            # the bitmasks would be read back as flags without any known character
+            raise ValueError(
+                f"Flag bitmasks can not be written: {', '.join(encoded)}, "
+                "keep the flags as strings or categories"
+            )
+        if self._parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(
+                    chunk, schema=self._writer.schema, preserve_index=False
+                )
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(
+                self.path,
+                sep=self.sep,
+                index=False,
+                mode="w" if self.rows == 0 else "a",
+                header=self.rows == 0,
+            )
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def stream(
+    source,
+    sink,
+    steps: Iterable[Step],
+    chunksize: int = 100_000,
+    sep: str | None = None,
+    workers: int = 1,
+    executor: str = "thread",
+) -> int:
+    """
+    Applies the steps to source chunk by chunk and writes the results to sink,
+    so that only one chunk is held in memory at a time. All calculations are row
+    local and read_chunks gives every chunk the same dtypes, which makes the result
+    identical to running the steps on the full frame.
+    With more than one worker each chunk is processed as in run_pipeline.
+    Returns the number of rows written.
+    """
+    steps = list(steps)
+    for step in steps:
+        resolve_step(step)
+    pool = _pool(workers, executor) if workers > 1 else None
+    try:
+        with ChunkWriter(sink, sep=sep) as writer:
+            for chunk in read_chunks(source, chunksize=chunksize, sep=sep):
+                if pool is None:
+                    chunk = apply_steps(chunk, steps)
+                else:
+                    chunk = _map_blocks(pool, chunk, steps, workers)
+                writer.write(chunk)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return writer.rows
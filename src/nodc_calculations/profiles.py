@@ -0,0 +1,87 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from nodc_calculations import profiling
+
+# Depth integrated inventories per profile. The rows are sorted once by visit and
+# depth, every pair of consecutive samples in a profile forms a segment, and the
+# trapezoids of all segments are summed per profile with np.add.reduceat.
+# Profiles are linear between the samples and are not extrapolated, a layer only
+# covers the sampled part of it. Missing values are skipped per parameter.
+
+# (top, bottom) in m, None for the deepest sample
+Layer = tuple[float, float | None]
+
+
+def _layer_name(layer: Layer) -> str:
+    top, bottom = layer
+    return f"{top:g}_{'bottom' if bottom is None else f'{bottom:g}'}"
+
+
+def _segment_sums(groups, depth, values, layers, size):
+    # trapezoid integral and covered thickness per group and layer
+    same = groups[1:] == groups[:-1]
+    z0, z1 = depth[:-1][same], depth[1:][same]
+    v0, v1 = values[:-1][same], values[1:][same]
+    segment_groups = groups[:-1][same]
+    slope = np.divide(v1 - v0, z1 - z0, out=np.zeros_like(v0), where=z1 > z0)
+
+    # the segments are ordered by group, reduceat needs a valid offset for the
+    # groups without segments, which are set to 0 afterwards
+    counts = np.bincount(segment_groups, minlength=size)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    results = []
+    for top, bottom in layers:
+        upper = np.maximum(z0, top)
+        lower = z1 if bottom is None else np.minimum(z1, bottom)
+        thickness = np.maximum(lower - upper, 0)
+        area = (v0 + slope * ((upper + lower) / 2 - z0)) * thickness
+        results.append(
+            tuple(
+                np.where(counts > 0, np.add.reduceat(np.append(sums, 0), offsets), 0)
+                for sums in (area, thickness)
+            )
+        )
+    return results
+
+
+def inventories(
+    df: pd.DataFrame,
+    parameters: Iterable[str] = ("din", "oxygen"),
+    layers: Iterable[Layer] = ((0, 10), (0, None)),
+    by: str | list[str] = "visit",
+    depth: str = "depth",
+) -> pd.DataFrame:
+    """
+    Returns one row per visit, i.e. unique value of the columns by, with the depth
+    integral and the mean of every parameter over every layer, e.g. din_integral_0_10
+    and din_mean_0_bottom. The integrals are in the unit of the parameter times m,
+    e.g. mmol/m2 for din in µmol/l. Layers without samples are NaN.
+    """
+    parameters, layers = list(parameters), list(layers)
+    with profiling.stage("inventories.sort", df):
+        keys = df[by] if isinstance(by, str) else pd.MultiIndex.from_frame(df[by])
+        groups, visits = pd.factorize(keys, sort=True)
+        depths = df[depth].to_numpy(dtype=np.float64, na_value=np.nan)
+        order = np.lexsort((depths, groups))
+        groups, depths = groups[order], depths[order]
+
+    result = {}
+    with profiling.stage("inventories.integrals", df):
+        for parameter in parameters:
+            values = df[parameter].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+            valid = ~np.isnan(values) & ~np.isnan(depths) & (groups >= 0)
+            sums = _segment_sums(
+                groups[valid], depths[valid], values[valid], layers, len(visits)
+            )
+            for layer, (integral, thickness) in zip(layers, sums):
+                integral = np.where(thickness > 0, integral, np.nan)
+                name = _layer_name(layer)
+                result[f"{parameter}_integral_{name}"] = integral
+                result[f"{parameter}_mean_{name}"] = integral / thickness
+
+    return pd.DataFrame(
+        result, index=visits.set_names([by] if isinstance(by, str) else by)
+    )
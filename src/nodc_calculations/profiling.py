@@ -0,0 +1,181 @@
+import contextlib
+import dataclasses
+import functools
+import logging
+import threading
+import time
+import tracemalloc
+from typing import Callable
+
+import pandas as pd
+
+# Timing of the calculations and their internal stages. Nothing is measured unless
+# a Profiler is active, in which case every stage produces a Record that is passed to
+# all active profilers.
+
+logger = logging.getLogger(__name__)
+
+_profilers = []
+_local = threading.local()
+_DISABLED = contextlib.nullcontext()
+
+
+@dataclasses.dataclass(frozen=True)
+class Record:
+    name: str
+    seconds: float
+    rows: int | None = None
+    # peak traced memory above the level at the start of the stage,
+    # None unless tracemalloc is tracing
+    allocated_bytes: int | None = None
+
+    @property
+    def rows_per_second(self) -> float | None:
+        if self.rows is None or not self.seconds:
+            return None
+        return self.rows / self.seconds
+
+
+class Profiler:
+    """
+    Collects a Record for every calculation and stage run while it is active.
+    Use as a context manager. With trace_memory=True tracemalloc is started, which
+    gives allocated_bytes at the cost of slower calculations. callback, if given,
+    is called with every record as it is produced.
+    """
+
+    def __init__(self, trace_memory: bool = False, callback: Callable | None = None):
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.records = []
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        _profilers.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _profilers.remove(self)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def add(self, record: Record):
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def to_records(self) -> list[dict]:
+        return [
+            dataclasses.asdict(record) | {"rows_per_second": record.rows_per_second}
+            for record in self.records
+        ]
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Returns calls, total time, rows, rows/s and largest allocation per stage
+        """
+        records = pd.DataFrame(
+            self.to_records(),
+            columns=["name", "seconds", "rows", "allocated_bytes", "rows_per_second"],
+        )
+        summary = records.groupby("name", sort=False).agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            rows=("rows", "sum"),
+            allocated_bytes=("allocated_bytes", "max"),
+        )
+        summary["rows_per_second"] = summary.rows / summary.seconds
+        return summary
+
+    def log(self, level: int = logging.INFO):
+        """
+        Writes one log message per record, with the record as extra["profile"]
+        """
+        for record in self.to_records():
+            logger.log(
+                level,
+                "%s: %.6f s, %s rows",
+                record["name"],
+                record["seconds"],
+                record["rows"],
+                extra={"profile": record},
+            )
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "start", "start_memory", "peak")
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = _rows(rows)
+        self.start_memory = None
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            # the peak is reset for every stage, the enclosing stages keep their own
+            # peak so far on the stack
+            stack = _local.__dict__.setdefault("stack", [])
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = self.peak = current
+            stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        allocated = None
+        if self.start_memory is not None:
+            stack = _local.stack
+            stack.pop()
+            if tracemalloc.is_tracing():
+                peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1].peak = max(stack[-1].peak, peak)
+                tracemalloc.reset_peak()
+                allocated = peak - self.start_memory
+        record = Record(self.name, seconds, self.rows, allocated)
+        for profiler in list(_profilers):
+            profiler.add(record)
+
+
+def _rows(rows) -> int | None:
+    if rows is None or isinstance(rows, int):
+        return rows
+    try:
+        return len(rows)
+    except TypeError:
+        return None
+
+
+def stage(name: str, rows=None):
+    """
+    Context manager timing a stage while a Profiler is active, does nothing otherwise.
+    rows is the number of rows or the data processed in the stage.
+    """
+    if not _profilers:
+        return _DISABLED
+    return _Stage(name, rows)
+
+
+def profiled(function: Callable) -> Callable:
+    """
+    Decorator timing every call of function as a stage named module.function, with
+    the length of the first argument as number of rows
+    """
+    name = f"{function.__module__.rsplit('.', 1)[-1]}.{function.__name__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _profilers:
+            return function(*args, **kwargs)
+        with _Stage(name, args[0] if args else None):
+            return function(*args, **kwargs)
+
+    return wrapper
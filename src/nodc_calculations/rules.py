@@ -0,0 +1,343 @@
+import abc
+import functools
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from nodc_calculations import flags, kernels
+
+# Rule tables for selections based on quality flags. A Selection is an ordered list of
+# Rules, each with a condition on the values and flags of named parameters and the
+# output for the rows where it is the first rule that applies. Conditions are built
+# from the classes below and combined with &, | and ~. Every distinct condition is
+# evaluated once per call, however many rules share it, and the rules are combined
+# in one np.select. compile() turns a chain of selections into one loop over the rows,
+# compiled with numba, that computes every condition and output of a row at once.
+
+
+class Condition(abc.ABC):
+    # chains of & and | are flattened into one All or AnyOf
+
+    def __and__(self, other: "Condition") -> "Condition":
+        if isinstance(self, All):
+            return All((*self.conditions, other))
+        return All((self, other))
+
+    def __or__(self, other: "Condition") -> "Condition":
+        if isinstance(self, AnyOf):
+            return AnyOf((*self.conditions, other))
+        return AnyOf((self, other))
+
+    def __invert__(self) -> "Condition":
+        return Not(self)
+
+    @abc.abstractmethod
+    def evaluate(self, context: "Context") -> np.ndarray: ...
+
+    @abc.abstractmethod
+    def source(self, loop: "_Loop") -> str:
+        # the condition for row i as a Python expression
+        ...
+
+
+@dataclass(frozen=True)
+class Valid(Condition):
+    """
+    There is a value and none of the rejected flag characters is set
+    """
+
+    parameter: str
+    rejected: str = flags.REJECTED
+
+    def evaluate(self, context):
+        return flags.valid(
+            context.values[self.parameter], context.bits[self.parameter], self.rejected
+        )
+
+    def source(self, loop):
+        value, bits = loop.value(self.parameter), loop.bits(self.parameter)
+        return f"not np.isnan({value}) and ({bits} & {flags.mask(self.rejected)}) == 0"
+
+
+@dataclass(frozen=True)
+class BelowDetection(Condition):
+    """
+    There is a value flagged with one of the below detection limit characters
+    """
+
+    parameter: str
+    characters: str = flags.BELOW_DETECTION
+
+    def evaluate(self, context):
+        return flags.below_detection(
+            context.values[self.parameter],
+            context.bits[self.parameter],
+            self.characters,
+        )
+
+    def source(self, loop):
+        value, bits = loop.value(self.parameter), loop.bits(self.parameter)
+        mask = flags.mask(self.characters)
+        return f"not np.isnan({value}) and ({bits} & {mask}) != 0"
+
+
+@dataclass(frozen=True)
+class Flagged(Condition):
+    """
+    Any of the flag characters is set, whether there is a value or not
+    """
+
+    parameter: str
+    characters: str
+
+    def evaluate(self, context):
+        return flags.any_of(context.bits[self.parameter], self.characters)
+
+    def source(self, loop):
+        return f"({loop.bits(self.parameter)} & {flags.mask(self.characters)}) != 0"
+
+
+@dataclass(frozen=True)
+class Missing(Condition):
+    parameter: str
+
+    def evaluate(self, context):
+        return np.isnan(context.values[self.parameter])
+
+    def source(self, loop):
+        return f"np.isnan({loop.value(self.parameter)})"
+
+
+@dataclass(frozen=True)
+class AtMost(Condition):
+    parameter: str
+    limit: float
+
+    def evaluate(self, context):
+        return context.values[self.parameter] <= self.limit
+
+    def source(self, loop):
+        return f"{loop.value(self.parameter)} <= {float(self.limit)!r}"
+
+
+@dataclass(frozen=True)
+class All(Condition):
+    conditions: tuple[Condition, ...]
+
+    def evaluate(self, context):
+        first, *others = (context.evaluate(c) for c in self.conditions)
+        result = first.copy()
+        for other in others:
+            result &= other
+        return result
+
+    def source(self, loop):
+        return " and ".join(loop.condition(c) for c in self.conditions)
+
+
+@dataclass(frozen=True)
+class AnyOf(Condition):
+    conditions: tuple[Condition, ...]
+
+    def evaluate(self, context):
+        first, *others = (context.evaluate(c) for c in self.conditions)
+        result = first.copy()
+        for other in others:
+            result |= other
+        return result
+
+    def source(self, loop):
+        return " or ".join(loop.condition(c) for c in self.conditions)
+
+
+@dataclass(frozen=True)
+class Not(Condition):
+    condition: Condition
+
+    def evaluate(self, context):
+        return ~context.evaluate(self.condition)
+
+    def source(self, loop):
+        return f"not {loop.condition(self.condition)}"
+
+
+class Context:
+    """
+    Values and flag bitmasks by parameter, and the conditions evaluated on them
+    """
+
+    def __init__(self, values: dict[str, np.ndarray], bits: dict[str, np.ndarray]):
+        self.values = values
+        self.bits = bits
+        self._results = {}
+
+    def evaluate(self, condition: Condition) -> np.ndarray:
+        if condition not in self._results:
+            self._results[condition] = condition.evaluate(self)
+        return self._results[condition]
+
+
+@dataclass(frozen=True)
+class Sum:
+    """
+    Sum of the values of the parameters, missing values count as 0 if skipna
+    """
+
+    parameters: tuple[str, ...]
+    skipna: bool = False
+
+    def evaluate(self, values: dict[str, np.ndarray]) -> np.ndarray:
+        stacked = [values[parameter] for parameter in self.parameters]
+        if self.skipna:
+            return np.nansum(stacked, axis=0)
+        return np.sum(stacked, axis=0)
+
+    def source(self, loop: "_Loop") -> str:
+        values = [loop.value(parameter) for parameter in self.parameters]
+        if self.skipna:
+            values = [f"(0.0 if np.isnan({value}) else {value})" for value in values]
+        return " + ".join(values)
+
+
+# the output of a rule: a parameter name, a constant, a Sum or a function of the
+# values, which can not be compiled
+Output = str | float | Sum | Callable[[dict[str, np.ndarray]], np.ndarray]
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    condition: Condition
+    output: Output
+
+
+@dataclass(frozen=True)
+class Selection:
+    rules: tuple[Rule, ...]
+    default: float = np.nan
+
+    def conditions(self, context: Context) -> dict[str, np.ndarray]:
+        """
+        Returns the condition of every rule by name, highest priority first
+        """
+        return {rule.name: context.evaluate(rule.condition) for rule in self.rules}
+
+    def select(self, context: Context) -> np.ndarray:
+        """
+        Returns the output of the first rule that applies in every row,
+        or the default where none applies
+        """
+        return np.select(
+            list(self.conditions(context).values()),
+            [self._output(rule.output, context) for rule in self.rules],
+            self.default,
+        )
+
+    def __call__(self, values: dict, bits: dict) -> np.ndarray:
+        return self.select(Context(values, bits))
+
+    @staticmethod
+    def _output(output: Output, context: Context):
+        if isinstance(output, str):
+            return context.values[output]
+        if isinstance(output, Sum):
+            return output.evaluate(context.values)
+        if callable(output):
+            return output(context.values)
+        return output
+
+
+class _Loop:
+    # collects the source of the loop body and the arrays it reads
+
+    def __init__(self):
+        self.lines = []
+        self.value_arrays = {}
+        self.bit_arrays = {}
+        self.selected = {}
+        self._conditions = {}
+
+    def value(self, parameter: str) -> str:
+        if parameter in self.selected:
+            return self.selected[parameter]
+        return f"{self.value_arrays.setdefault(parameter, f'v{len(self.value_arrays)}')}[i]"
+
+    def bits(self, parameter: str) -> str:
+        return f"{self.bit_arrays.setdefault(parameter, f'b{len(self.bit_arrays)}')}[i]"
+
+    def condition(self, condition: Condition) -> str:
+        # every distinct condition is assigned to a local once per row
+        if condition not in self._conditions:
+            source = condition.source(self)
+            self._conditions[condition] = name = f"c{len(self._conditions)}"
+            self.lines.append(f"{name} = {source}")
+        return self._conditions[condition]
+
+    def output(self, output: Output) -> str:
+        if isinstance(output, str):
+            return self.value(output)
+        if isinstance(output, Sum):
+            return output.source(self)
+        if callable(output):
+            raise ValueError(f"Function outputs can not be compiled: {output!r}")
+        return repr(float(output))
+
+    def select(self, name: str, selection: Selection):
+        conditions = [self.condition(rule.condition) for rule in selection.rules]
+        keywords = ["if"] + ["elif"] * (len(conditions) - 1)
+        for keyword, condition, rule in zip(keywords, conditions, selection.rules):
+            self.lines.append(f"{keyword} {condition}:")
+            self.lines.append(f"    s = {self.output(rule.output)}")
+        self.lines += ["else:", f"    s = {float(selection.default)!r}"]
+        # o<n> is the output array, s<n> the result in row i for later selections
+        index = len(self.selected)
+        self.selected[name] = f"s{index}"
+        self.lines += [f"s{index} = s", f"o{index}[i] = s"]
+
+
+@functools.lru_cache
+def compile(
+    selections: tuple[tuple[str, Selection], ...], jit: bool = True
+) -> Callable[[dict, dict], dict[str, np.ndarray]]:
+    """
+    Returns a function of values and bits, like Selection.__call__, that runs the
+    named selections in order in one loop over the rows and returns their results
+    by name. The result of a selection is a value for the ones after it. The loop
+    is compiled with numba if jit is True and numba is installed.
+    """
+    if len({name for name, _ in selections}) < len(selections):
+        raise ValueError("The selections need different names")
+    loop = _Loop()
+    for name, selection in selections:
+        loop.select(name, selection)
+    arguments = [
+        *loop.value_arrays.values(),
+        *loop.bit_arrays.values(),
+        *(f"o{i}" for i in range(len(selections))),
+    ]
+    body = "\n".join(f"        {line}" for line in loop.lines)
+    source = (
+        "import numpy as np\n"
+        "from numpy import inf, nan\n\n\n"
+        f"def _loop({', '.join(arguments)}):\n"
+        f"    for i in range(o0.shape[0]):\n{body}\n"
+    )
+    if jit and kernels.numba is not None:
+        function = kernels.compile_source(source, "_loop")
+    else:
+        namespace = {}
+        exec(source, namespace)
+        function = namespace["_loop"]
+
+    def run(values: dict, bits: dict) -> dict[str, np.ndarray]:
+        columns = [
+            *(np.ascontiguousarray(values[p], np.float64) for p in loop.value_arrays),
+            *(np.ascontiguousarray(bits[p], np.uint8) for p in loop.bit_arrays),
+        ]
+        size = len(columns[0])
+        results = {name: np.empty(size, dtype=np.float64) for name, _ in selections}
+        function(*columns, *results.values())
+        return results
+
+    return run
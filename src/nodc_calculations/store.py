@@ -0,0 +1,158 @@
+import hashlib
+import os
+import pathlib
+import threading
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from nodc_calculations import flags, graph
+from nodc_calculations._cache import default_cache_dir
+from nodc_calculations._version import version
+
+# Persistent cache of calculated parameters. The rows are split in chunks and the
+# results of every chunk are stored in an Arrow IPC (Feather) file named by a hash of
+# the input columns of the chunk, the calculated parameters and the library version.
+# A chunk whose inputs have not changed is memory mapped from the store instead of
+# being calculated again.
+
+
+def _inputs(nodes: list[graph.Node], columns) -> list[str]:
+    # the columns read from the frame, i.e. not produced by one of the nodes
+    produced = {output for node in nodes for output in node.outputs}
+    inputs = []
+    for node in nodes:
+        for column in node.inputs:
+            if column in columns and column not in produced and column not in inputs:
+                inputs.append(column)
+    return inputs
+
+
+class ResultStore:
+    """
+    Adds calculated parameters to frames like graph.compute, reusing results stored
+    in directory from earlier runs on identical input rows. Only chunks of chunksize
+    rows with new or changed inputs are calculated. When the files in the store
+    exceed max_bytes the least recently used ones are deleted.
+    """
+
+    def __init__(
+        self, directory=None, max_bytes: int = 2**30, chunksize: int = 100_000
+    ):
+        self.directory = pathlib.Path(directory or default_cache_dir() / "results")
+        self.max_bytes = max_bytes
+        self.chunksize = chunksize
+        self.hits = 0
+        self.misses = 0
+        self._version = version()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict:
+        files = list(self.directory.glob("*.arrow"))
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "files": len(files),
+            "bytes": sum(path.stat().st_size for path in files),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        with self._lock:
+            for path in self.directory.glob("*.arrow"):
+                path.unlink(missing_ok=True)
+            self.hits = 0
+            self.misses = 0
+
+    def compute(self, df: pd.DataFrame, outputs: Iterable[str]) -> pd.DataFrame:
+        """
+        Adds the requested outputs, and the intermediate parameters they need, as
+        columns to df and returns df
+        """
+        outputs = list(outputs)
+        nodes = graph.plan(df.columns, outputs)
+        if not nodes or not len(df):
+            return graph.compute(df, outputs)
+
+        inputs = _inputs(nodes, df.columns)
+        produced = [output for node in nodes for output in node.outputs]
+        header = repr((self._version, inputs, produced)).encode()
+        results = [
+            self._chunk(
+                df.iloc[start : start + self.chunksize], inputs, produced, header
+            )
+            for start in range(0, len(df), self.chunksize)
+        ]
+        for column in produced:
+            df[column] = np.concatenate([result[column] for result in results])
+        return df
+
+    def _key(self, chunk: pd.DataFrame, inputs: list[str], header: bytes) -> str:
+        digest = hashlib.blake2b(header, digest_size=20)
+        # the row hashes of all columns are combined before they are digested
+        hashes = np.zeros(len(chunk), dtype=np.uint64)
+        for column in inputs:
+            digest.update(column.encode())
+            if column.startswith("Q_"):
+                # the codes of the few distinct flags are much cheaper to get than
+                # a hash of every string
+                codes, categories = flags.factorize(chunk[column])
+                digest.update(repr(categories).encode())
+                column_hashes = pd.util.hash_array(codes)
+            else:
+                column_hashes = pd.util.hash_pandas_object(
+                    chunk[column], index=False
+                ).to_numpy()
+            hashes = hashes * np.uint64(1_000_003) ^ column_hashes
+        digest.update(hashes.tobytes())
+        return digest.hexdigest()
+
+    def _chunk(self, chunk, inputs, produced, header) -> dict[str, np.ndarray]:
+        import pyarrow as pa
+
+        path = self.directory / f"{self._key(chunk, inputs, header)}.arrow"
+        try:
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+                result = {column: table[column].to_numpy() for column in produced}
+            # the modification time orders the files for eviction
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return result
+        except FileNotFoundError:
+            pass
+
+        calculated = graph.compute(chunk[inputs].copy(), produced)
+        result = {column: calculated[column].to_numpy() for column in produced}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so that other processes never see a
+        # partially written chunk
+        temporary = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        table = pa.table(result)
+        with (
+            pa.OSFile(str(temporary), "wb") as sink,
+            pa.ipc.new_file(sink, table.schema) as writer,
+        ):
+            writer.write_table(table)
+        os.replace(temporary, path)
+        with self._lock:
+            self.misses += 1
+            self._evict()
+        return result
+
+    def _evict(self):
+        files = []
+        for path in self.directory.glob("*.arrow"):
+            try:
+                files.append((path.stat(), path))
+            except FileNotFoundError:
+                continue
+        size = sum(stat.st_size for stat, _ in files)
+        for stat, path in sorted(files, key=lambda file: file[0].st_mtime_ns):
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+# the parameters of dissolved_inorganic_nitrogen and oxygen
+PARAMETERS = ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL", "DOXY_CTD")
+FLAGS = ("1_0", "0_0", "4_0", "3_0", "6_0", "<_0", "B_0", "S_0", "Z_0", ">_0", "1_4")
+
+
+def _random_data(
+    size: int,
+    seed: int = 0,
+    parameters: tuple[str, ...] = PARAMETERS,
+    flags: tuple[str, ...] = FLAGS,
+    missing: float = 0.3,
+    decimals: int | None = None,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for parameter in parameters:
+        values = rng.uniform(0, 10, size)
+        if decimals is not None:
+            values = values.round(decimals)
+        values[rng.random(size) < missing] = np.nan
+        data[parameter] = values
+        data[f"Q_{parameter}"] = rng.choice(flags, size)
+    return pd.DataFrame(data)
+
+
+@pytest.fixture
+def random_data():
+    """
+    Returns a function of size and seed making a random SHARK frame with a value
+    and a Q_ flag column per parameter. A fraction missing of the values are NaN,
+    the others are uniform in [0, 10), rounded to decimals if given.
+    """
+    return _random_data
+
+
+@pytest.fixture(autouse=True, scope="session")
+def cache_dir(tmp_path_factory):
+    # keeps the generated kernels, tables and results out of the home directory
+    path = tmp_path_factory.mktemp("cache")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("NODC_CALCULATIONS_CACHE", str(path))
+        yield path
@@ -0,0 +1,153 @@
+import pytest
+import gsw
+import numpy as np
+import pandas as pd
+from nodc_calculations import arrays, calculate, convert
+
+DIN_DATA = {
+    "H2S": [np.nan, np.nan, 5],
+    "Q_H2S": ["1_0", "1_0", "1_0"],
+    "AMON": [1, 3, 3],
+    "Q_AMON": ["6_0", "1_0", "1_0"],
+    "DOXY_BTL": [6, 6, 5],
+    "Q_DOXY_BTL": ["1_0", "1_0", "1_0"],
+    "DOXY_CTD": [np.nan, 7, np.nan],
+    "Q_DOXY_CTD": ["1_0", "1_0", "1_0"],
+    "NTRZ": [np.nan, np.nan, np.nan],
+    "Q_NTRZ": ["1_0", "1_0", "1_0"],
+    "NTRA": [2, 2, 2],
+    "Q_NTRA": ["1_0", "1_0", "1_0"],
+    "NTRI": [1, 1, 1],
+    "Q_NTRI": ["1_0", "1_0", "1_0"],
+}
+
+
+def test_din_does_not_modify_inputs():
+    data = pd.DataFrame(DIN_DATA)
+    ntra = data.NTRA.to_numpy(dtype=float)
+    ntra_before = ntra.copy()
+
+    ntrz_corrected, din = arrays.din(
+        ntra, data.Q_NTRA, data.NTRI, data.Q_NTRI, data.NTRZ, data.Q_NTRZ,
+        data.AMON, data.Q_AMON, data.H2S, data.Q_H2S, data.DOXY_BTL, data.Q_DOXY_BTL,
+    )  # fmt: skip
+
+    np.testing.assert_array_equal(ntrz_corrected, [3.0, 3.0, 3.0])
+    np.testing.assert_array_equal(din, [3.0, 6.0, 3.0])
+    np.testing.assert_array_equal(ntra, ntra_before)
+    assert list(data.columns) == list(DIN_DATA)
+
+
+def test_arrays_accept_arrow():
+    pa = pytest.importorskip("pyarrow")
+    data = pd.DataFrame(DIN_DATA)
+    table = pa.Table.from_pandas(data)
+
+    result = arrays.oxygen(
+        table["DOXY_BTL"],
+        table["Q_DOXY_BTL"],
+        table["DOXY_CTD"],
+        table["Q_DOXY_CTD"],
+        table["H2S"],
+        table["Q_H2S"],
+    )
+
+    np.testing.assert_array_equal(result, [6.0, 6.0, 0.0])
+
+
+@pytest.mark.parametrize(
+    "function, column",
+    (
+        (calculate.dissolved_inorganic_nitrogen, "din"),
+        (calculate.oxygen, "oxygen"),
+    ),
+)
+def test_not_inplace_returns_series(function, column):
+    data = pd.DataFrame(DIN_DATA, index=[10, 11, 12])
+
+    result = function(data, inplace=False)
+
+    assert list(data.columns) == list(DIN_DATA)
+    assert result.name == column
+    pd.testing.assert_series_equal(
+        result, function(data.copy())[column], check_names=False
+    )
+
+
+def test_oxygen_saturation_not_inplace():
+    data = pd.DataFrame(
+        {"oxygen": [5, 6], "temp": [10, 15], "salt": [30, 31], "depth": [0, 5]}
+    )
+
+    result = calculate.oxygen_saturation(data, inplace=False)
+
+    assert list(data.columns) == ["oxygen", "temp", "salt", "depth"]
+    np.testing.assert_allclose(result, [76.559275, 102.671144], rtol=1e-6)
+
+
+def test_convert_not_inplace():
+    data = pd.DataFrame({"oxygen": [1.0, 2.0], "N": [14.00672, 28.01344]})
+
+    umol = convert.oxygen_ml2umol(data, "oxygen", inplace=False)
+    mol = convert.gram_per_liter_to_mol_per_liter(
+        data, "N", "N", "N_mol", inplace=False
+    )
+
+    assert list(data.columns) == ["oxygen", "N"]
+    np.testing.assert_allclose(umol, [44.661, 89.322])
+    np.testing.assert_allclose(mol, [1.0, 2.0])
+
+
+def test_oxygen_parameters():
+    data = pd.DataFrame(
+        {
+            "oxygen": [5, 6, 7],
+            "temp": [10, 15, 20],
+            "salt": [30, 31, 35],
+            "depth": [0, 5, 10],
+        }
+    )
+    expected = data.copy()
+    calculate.oxygen_saturation(expected)
+
+    calculate.oxygen_parameters(data)
+
+    pd.testing.assert_frame_equal(data[expected.columns], expected)
+    np.testing.assert_allclose(
+        data.aou_umol_kg,
+        data.oxygen_solubility_umol_kg - data.oxygen_umol_kg,
+    )
+    np.testing.assert_allclose(
+        data.oxygen_umol_kg / data.oxygen_solubility_umol_kg * 100,
+        data.oxygen_saturation,
+    )
+
+
+def test_latitude_column():
+    data = pd.DataFrame(
+        {
+            "oxygen": [5, 6, 7],
+            "temp": [10, 15, 20],
+            "salt": [30, 31, 35],
+            "depth": [500, 500, 500],
+            "LATIT": [56.0, 58.0, 65.5],
+        }
+    )
+
+    density = calculate.density(data, inplace=False, latitude="LATIT")
+    saturation = calculate.oxygen_saturation(data, inplace=False, latitude="LATIT")
+
+    assert density[1] == calculate.density(data, inplace=False)[1]
+    assert density[0] != calculate.density(data, inplace=False)[0]
+    np.testing.assert_array_equal(
+        density,
+        arrays.density(
+            data.salt, data.temp, None, p=gsw.p_from_z(-data.depth, data.LATIT)
+        ),
+    )
+    np.testing.assert_array_equal(
+        saturation,
+        calculate.oxygen_parameters(
+            data, inplace=False, latitude="LATIT"
+        ).oxygen_saturation,
+    )
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import backends
+
+
+def _expected(data):
+    return backends.oxygen(backends.dissolved_inorganic_nitrogen(data.copy()))[
+        ["NTRZ_corrected", "din", "oxygen"]
+    ]
+
+
+def test_arrow_matches_pandas(random_data):
+    pa = pytest.importorskip("pyarrow")
+    data = random_data(2000)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+
+    result = backends.oxygen(backends.dissolved_inorganic_nitrogen(table))
+
+    assert table.column_names == list(data.columns)
+    pd.testing.assert_frame_equal(
+        result.select(["NTRZ_corrected", "din", "oxygen"]).to_pandas(), _expected(data)
+    )
+
+
+@pytest.mark.parametrize("lazy", (False, True))
+def test_polars_matches_pandas(random_data, lazy):
+    pl = pytest.importorskip("polars")
+    pytest.importorskip("pyarrow")
+    data = random_data(2000, seed=1)
+    frame = pl.from_pandas(data)
+    if lazy:
+        frame = frame.lazy()
+
+    result = backends.oxygen(backends.dissolved_inorganic_nitrogen(frame))
+
+    if lazy:
+        assert isinstance(result, pl.LazyFrame)
+        result = result.collect()
+    pd.testing.assert_frame_equal(
+        result.select(["NTRZ_corrected", "din", "oxygen"])
+        .to_pandas()
+        .astype(float)
+        .fillna(np.nan),
+        _expected(data),
+    )
+
+
+def test_oxygen_without_h2s():
+    pl = pytest.importorskip("polars")
+    pytest.importorskip("pyarrow")
+    frame = pl.DataFrame(
+        {
+            "DOXY_BTL": [5.0],
+            "Q_DOXY_BTL": ["1_0"],
+            "DOXY_CTD": [6.0],
+            "Q_DOXY_CTD": ["S"],
+        }
+    )
+
+    assert backends.oxygen(frame)["oxygen"].to_list() == [5.0]
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        backends.oxygen({"DOXY_BTL": [5.0]})
@@ -293,7 +293,7 @@ def test_din_return_row_sum(given_data, expected_din):
 def test_oxyen_saturation(given_data, expected_oxysat):
     data = pd.DataFrame(given_data)
 
-    gsw, sw, _ = calculate.oxygen_saturation(data)
+    gsw, sw, _ = calculate.oxygen_saturation(data, sw=True)
 
     result = float("{:.3f}".format(data["oxygen_saturation"].values[0]))
     # test gsw against expected
@@ -0,0 +1,119 @@
+import importlib.metadata
+import os
+
+import pytest
+import pandas as pd
+from nodc_calculations import cli, pipeline
+
+STEPS = ["dissolved_inorganic_nitrogen", "oxygen"]
+
+
+@pytest.fixture
+def sources(tmp_path, random_data):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for seed, name in enumerate(("a.txt", "b.txt", "c.csv")):
+        data = random_data(100, seed=seed, missing=0)
+        data.to_csv(
+            directory / name, sep="\t" if name.endswith(".txt") else ",", index=False
+        )
+    return directory
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_files_are_processed(tmp_path, sources, capsys, workers):
+    output = tmp_path / "output"
+
+    status = cli.main(
+        [
+            str(sources / "*.txt"),
+            str(sources / "c.csv"),
+            "-c",
+            *STEPS,
+            "-o",
+            str(output),
+            "-w",
+            str(workers),
+        ]
+    )
+
+    assert status == 0
+    assert sorted(path.name for path in output.iterdir()) == ["a.txt", "b.txt", "c.csv"]
+    result = next(pipeline.read_chunks(output / "a.txt"))
+    expected = pipeline.apply_steps(
+        next(pipeline.read_chunks(sources / "a.txt")), STEPS
+    )
+    pd.testing.assert_frame_equal(result, expected)
+    assert "3 files (300 rows) processed, 0 up to date" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("check", ["mtime", "hash"])
+def test_up_to_date_files_are_skipped(tmp_path, sources, capsys, check):
+    arguments = [
+        str(sources),
+        "-c",
+        *STEPS,
+        "-o",
+        str(tmp_path / "output"),
+        "--check",
+        check,
+    ]
+    cli.main(arguments)
+    capsys.readouterr()
+
+    cli.main(arguments)
+    assert "0 files (0 rows) processed, 3 up to date" in capsys.readouterr().out
+
+    (sources / "b.txt").write_text((sources / "b.txt").read_text() + "\n")
+    os.utime(sources / "b.txt", (1e10, 1e10))
+    cli.main(arguments)
+    assert "1 files (100 rows) processed, 2 up to date" in capsys.readouterr().out
+
+
+def test_failures_are_reported(tmp_path, sources, capsys):
+    (sources / "d.csv").write_text("salt\n30\n")
+
+    status = cli.main([str(sources), "-c", *STEPS, "-o", str(tmp_path / "output")])
+
+    assert status == 1
+    output = capsys.readouterr()
+    assert "d.csv" in output.err
+    assert "3 files (300 rows) processed, 0 up to date, 1 failed" in output.out
+
+
+def test_unexpected_errors_are_raised(tmp_path, sources, monkeypatch):
+    def stream(*args, **kwargs):
+        raise TypeError("bug")
+
+    monkeypatch.setattr(pipeline, "stream", stream)
+
+    with pytest.raises(TypeError, match="bug"):
+        cli.main([str(sources), "-c", *STEPS, "-o", str(tmp_path / "output")])
+
+
+def test_unknown_calculation(tmp_path, sources):
+    with pytest.raises(SystemExit):
+        cli.main([str(sources), "-c", "salinity", "-o", str(tmp_path)])
+
+
+def test_hash_check_without_installed_package(tmp_path, sources, monkeypatch):
+    def version(name):
+        raise importlib.metadata.PackageNotFoundError(name)
+
+    monkeypatch.setattr(importlib.metadata, "version", version)
+    arguments = [str(sources), "-c", *STEPS, "-o", str(tmp_path), "--check", "hash"]
+
+    assert cli.main(arguments) == 0
+    assert cli.up_to_date(sources / "a.txt", tmp_path / "a.txt", STEPS, "hash")
+
+
+def test_inputs_with_the_same_name(tmp_path, sources, capsys):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "a.txt").write_text((sources / "a.txt").read_text())
+
+    with pytest.raises(SystemExit):
+        cli.main([str(sources), str(other), "-c", *STEPS, "-o", str(tmp_path / "o")])
+
+    assert "a.txt" in capsys.readouterr().err
+    assert not (tmp_path / "o").exists()
@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import arrays, convert
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "oxygen": [5.0, 6.0, 7.0],
+            "NTRA": [1.0, 2.0, 14.0],
+            "salt": [30, 31, 35],
+            "temp": [10, 15, 20],
+            "depth": [0, 5, 10],
+        }
+    )
+
+
+def test_matches_existing_conversions(data):
+    result = convert.convert_units(
+        data,
+        {
+            "oxygen_umol": convert.Conversion("oxygen", "O2", "ml/l", "umol/l"),
+            "NTRA_umol": convert.Conversion("NTRA", "N", "µg/l", "µmol/l"),
+        },
+        inplace=False,
+    )
+
+    np.testing.assert_allclose(
+        result["oxygen_umol"], convert.oxygen_ml2umol(data, "oxygen", inplace=False)
+    )
+    np.testing.assert_allclose(
+        result["NTRA_umol"],
+        convert.gram_per_liter_to_mol_per_liter(data, "N", "NTRA", "N", inplace=False),
+    )
+    assert "oxygen_umol" not in data.columns
+
+
+def test_oxygen_units(data):
+    convert.convert_units(
+        data,
+        {
+            "oxygen_mg": convert.Conversion("oxygen", "O2", "ml/l", "mg/l"),
+            "oxygen_umol_kg": convert.Conversion("oxygen", "O2", "ml/l", "µmol/kg"),
+        },
+    )
+    convert.convert_units(
+        data,
+        {"oxygen_ml": convert.Conversion("oxygen_umol_kg", "O2", "µmol/kg", "ml/l")},
+    )
+
+    np.testing.assert_allclose(data["oxygen_mg"], data["oxygen"] * 1.429, rtol=1e-3)
+    np.testing.assert_allclose(
+        data["oxygen_umol_kg"],
+        data["oxygen"]
+        * arrays.UMOL_PER_ML_OXYGEN
+        / arrays.density(data.salt, data.temp, data.depth)
+        * 1000,
+    )
+    np.testing.assert_allclose(data["oxygen_ml"], data["oxygen"])
+
+
+@pytest.mark.parametrize(
+    "conversion",
+    [
+        convert.Conversion("NTRA", "N", "ml/l", "µmol/l"),
+        convert.Conversion("NTRA", "NO3", "µg/l", "µmol/l"),
+        convert.Conversion("NTRA", "N", "µg/l", "g/m3"),
+    ],
+)
+def test_invalid_conversions(data, conversion):
+    with pytest.raises(ValueError):
+        convert.convert_units(data, {"NTRA_umol": conversion})
@@ -0,0 +1,67 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from nodc_calculations import calculate, diagnostics
+
+OXYGEN_DATA = {
+    "H2S": [5, np.nan, np.nan, np.nan, np.nan],
+    "Q_H2S": ["1_0", "1_0", "1_0", "1_0", "1_0"],
+    "DOXY_BTL": [2, 5, 5, np.nan, np.nan],
+    "Q_DOXY_BTL": ["1_0", "1_0", "S_0", "1_0", "1_0"],
+    "DOXY_CTD": [np.nan, 6, 6, 0.1, np.nan],
+    "Q_DOXY_CTD": ["1_0", "1_0", "1_0", "<_0", "1_0"],
+}
+
+
+def test_oxygen_branch_counts(caplog):
+    with caplog.at_level(logging.DEBUG, logger="nodc_calculations.diagnostics"):
+        calculate.oxygen(pd.DataFrame(OXYGEN_DATA))
+
+    (record,) = caplog.records
+    assert record.calculation == "oxygen"
+    assert record.branch_counts == {
+        "h2s": 1,
+        "h2s_and_oxygen_below_detection": 0,
+        "btl": 1,
+        "ctd": 1,
+        "ctd_below_detection": 1,
+        "none": 1,
+    }
+
+
+def test_din_branch_counts(caplog):
+    data = pd.DataFrame(
+        {
+            "H2S": [np.nan, np.nan],
+            "Q_H2S": ["1_0", "1_0"],
+            "AMON": [1, 3],
+            "Q_AMON": ["6_0", "1_0"],
+            "DOXY_BTL": [6, 6],
+            "Q_DOXY_BTL": ["1_0", "1_0"],
+            "NTRZ": [np.nan, np.nan],
+            "Q_NTRZ": ["1_0", "1_0"],
+            "NTRA": [2, 2],
+            "Q_NTRA": ["1_0", "1_0"],
+            "NTRI": [1, 1],
+            "Q_NTRI": ["1_0", "1_0"],
+        }
+    )
+
+    with caplog.at_level(logging.DEBUG, logger="nodc_calculations.diagnostics"):
+        calculate.dissolved_inorganic_nitrogen(data)
+
+    (record,) = caplog.records
+    assert record.branch_counts["ntrz_corrected_and_amon"] == 1
+    assert record.branch_counts["amon_below_detection"] == 1
+    assert sum(record.branch_counts.values()) == 2
+
+
+def test_branches_are_not_evaluated_when_disabled(capsys):
+    def branches():
+        raise AssertionError("branch counts should not be calculated")
+
+    diagnostics.branch_counts("oxygen", branches, 1)
+    calculate.oxygen(pd.DataFrame(OXYGEN_DATA))
+
+    assert capsys.readouterr().out == ""
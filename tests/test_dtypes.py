@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import calculate, dtypes, pipeline
+
+
+@pytest.fixture
+def data(random_data):
+    data = random_data(1000, missing=0, decimals=2)
+    return data.astype({column: object for column in data if column.startswith("Q_")})
+
+
+@pytest.mark.parametrize("flags", ["category", "uint8"])
+def test_calculations_on_compact_frames(data, flags):
+    expected = calculate.oxygen(calculate.dissolved_inorganic_nitrogen(data.copy()))
+    policy = dtypes.DtypePolicy(flags=flags, drop=("NTRZ_corrected",))
+
+    result = pipeline.run_pipeline(
+        policy(data.copy()), ["dissolved_inorganic_nitrogen", "oxygen", policy]
+    )
+
+    assert "NTRZ_corrected" not in result.columns
+    assert result["din"].dtype == np.float32
+    assert result["NTRA"].dtype == np.float64
+    assert result["Q_AMON"].dtype == flags
+    np.testing.assert_allclose(result["din"], expected["din"], rtol=1e-6)
+    np.testing.assert_allclose(result["oxygen"], expected["oxygen"], rtol=1e-6)
+
+
+def test_memory_report(data):
+    before = dtypes.memory_report(data)
+
+    after = dtypes.memory_report(
+        dtypes.DtypePolicy(float_columns="all").apply(data, inplace=False)
+    )
+
+    assert before.loc["Q_NTRA", "dtype"] == "object"
+    assert after.loc["NTRA", "dtype"] == "float32"
+    assert after.bytes.sum() < before.bytes.sum() / 2
+    assert data["NTRA"].dtype == np.float64
+
+
+def test_unknown_flag_dtype():
+    with pytest.raises(ValueError):
+        dtypes.DtypePolicy(flags="int8")
+
+
+def test_flag_bitmasks_are_not_written(data, tmp_path):
+    source, sink = tmp_path / "source.csv", tmp_path / "sink.csv"
+    data.to_csv(source, index=False)
+
+    with pytest.raises(ValueError, match="Q_NTRA"):
+        pipeline.stream(source, sink, [dtypes.DtypePolicy(flags="uint8")])
+    pipeline.stream(source, sink, [dtypes.DtypePolicy()])
+
+    result = next(pipeline.read_chunks(sink))
+    pd.testing.assert_series_equal(result["Q_AMON"], data["Q_AMON"], check_dtype=False)
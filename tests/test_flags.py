@@ -0,0 +1,96 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import calculate, flags
+
+
+@pytest.mark.parametrize(
+    "given_flags, characters, expected",
+    (
+        (["1_0", "4_0", "3_0", "B_0"], flags.REJECTED, [False, True, True, True]),
+        (["1_0", "6_0", "<_0", "S"], flags.BELOW_DETECTION, [False, True, True, False]),
+        (["Z_0", ">_0", "1_0", None], "Z>", [True, True, False, False]),
+        # characters anywhere in the string count, as with str.contains
+        (["1_4", "0_0"], "4", [True, False]),
+    ),
+)
+def test_any_of(given_flags, characters, expected):
+    bits = flags.encode(pd.Series(given_flags, dtype=object))
+
+    np.testing.assert_array_equal(flags.any_of(bits, characters), expected)
+
+
+def test_encode_matches_str_contains():
+    given_flags = pd.Series(["1_0", "4_0", "6_0", "<_0", "B_0", "S_3", "Z_0", ">_0"])
+    bits = flags.encode(given_flags)
+
+    assert bits.dtype == np.uint8
+    for characters in ("43BS", "6<", "643BS<", "BSZ<436", "<"):
+        expected = given_flags.str.contains("|".join(characters), regex=True)
+        np.testing.assert_array_equal(flags.any_of(bits, characters), expected)
+
+
+def test_valid_and_below_detection():
+    values = pd.Series([1.0, np.nan, 2.0, 3.0])
+    bits = flags.encode(["1_0", "1_0", "4_0", "6_0"])
+
+    np.testing.assert_array_equal(flags.valid(values, bits), [True, False, False, True])
+    np.testing.assert_array_equal(
+        flags.below_detection(values, bits), [False, False, False, True]
+    )
+
+
+def test_unknown_flag_character():
+    with pytest.raises(ValueError):
+        flags.mask("X")
+
+
+def test_encode_categorical_and_arrow_dictionary():
+    given_flags = pd.Series(["1_0", "4_0", None, "6_0", "1_0"], dtype=object)
+    expected = flags.encode(given_flags)
+
+    np.testing.assert_array_equal(
+        flags.encode(given_flags.astype("category")), expected
+    )
+
+    pa = pytest.importorskip("pyarrow")
+    dictionary = pa.array(given_flags).dictionary_encode()
+    np.testing.assert_array_equal(flags.encode(dictionary), expected)
+    np.testing.assert_array_equal(
+        flags.encode(given_flags.astype(pd.ArrowDtype(dictionary.type))), expected
+    )
+
+
+def test_calculations_accept_categorical_flags():
+    data = pd.DataFrame(
+        {
+            "H2S": [np.nan, 5, np.nan],
+            "Q_H2S": ["1_0", "1_0", "1_0"],
+            "AMON": [1, 3, 5],
+            "Q_AMON": ["6_0", "1_0", "1_0"],
+            "DOXY_BTL": [6, 6, 1],
+            "Q_DOXY_BTL": ["1_0", "1_0", "1_0"],
+            "DOXY_CTD": [6, 6, 1],
+            "Q_DOXY_CTD": ["1_0", "1_0", "1_0"],
+            "NTRZ": [np.nan, np.nan, 4],
+            "Q_NTRZ": ["1_0", "1_0", "1_0"],
+            "NTRA": [2, 2, 3],
+            "Q_NTRA": ["1_0", "1_0", "4_0"],
+            "NTRI": [1, 1, 1],
+            "Q_NTRI": ["1_0", "1_0", "1_0"],
+        }
+    )
+    categorized = flags.categorize(data)
+
+    assert all(
+        isinstance(categorized[column].dtype, pd.CategoricalDtype)
+        for column in categorized.columns
+        if column.startswith("Q_")
+    )
+    for function in (calculate.dissolved_inorganic_nitrogen, calculate.oxygen):
+        expected = function(data.copy())
+        result = function(categorized.copy())
+        pd.testing.assert_frame_equal(
+            result.drop(columns=categorized.columns),
+            expected.drop(columns=data.columns),
+        )
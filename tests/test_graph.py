@@ -0,0 +1,179 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import calculate, graph
+
+PHYSICS = {
+    "oxygen": [5, 6, 7],
+    "temp": [10, 15, 20],
+    "salt": [30, 31, 35],
+    "depth": [0, 5, 10],
+}
+PARAMETERS = ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL", "DOXY_CTD")
+
+
+def test_oxygen_saturation_matches_calculate():
+    data = pd.DataFrame(PHYSICS)
+    expected = data.copy()
+    calculate.oxygen_saturation(expected)
+
+    graph.compute(data, ["oxygen_saturation"])
+
+    pd.testing.assert_series_equal(data["density"], expected["density"])
+    pd.testing.assert_series_equal(
+        data["oxygen_saturation"], expected["oxygen_saturation"]
+    )
+
+
+def test_existing_columns_are_reused():
+    data = pd.DataFrame(PHYSICS)
+    data["density"] = 1000.0
+
+    nodes = graph.plan(data.columns, ["oxygen_saturation"])
+
+    assert [node.outputs for node in nodes] == [
+        ("potential_temperature",),
+        ("oxygen_solubility",),
+        ("oxygen_saturation",),
+    ]
+
+
+def test_each_node_runs_once():
+    nodes = graph.plan(
+        ["salt", "temp", "depth", "oxygen"], ["oxygen_saturation", "density"]
+    )
+
+    assert len(nodes) == len(set(nodes)) == 5
+
+
+def test_din_and_oxygen():
+    data = pd.DataFrame(
+        {parameter: [1.0] for parameter in PARAMETERS}
+        | {f"Q_{parameter}": ["1_0"] for parameter in PARAMETERS}
+    )
+    data["H2S"] = np.nan
+    expected = calculate.oxygen(calculate.dissolved_inorganic_nitrogen(data.copy()))
+
+    graph.compute(data, ["din", "oxygen"])
+
+    pd.testing.assert_frame_equal(data, expected[data.columns])
+
+
+def test_missing_inputs_are_reported_up_front():
+    data = pd.DataFrame({"salt": [30], "oxygen": [5]})
+
+    missing = graph.missing_inputs(data.columns, ["oxygen_saturation"])
+
+    assert missing == ["temp", "depth"]
+    with pytest.raises(ValueError, match="temp, depth"):
+        graph.compute(data, ["oxygen_saturation"])
+    assert list(data.columns) == ["salt", "oxygen"]
+
+
+def test_optional_inputs():
+    data = pd.DataFrame(
+        {"DOXY_BTL": [5], "Q_DOXY_BTL": ["1_0"], "DOXY_CTD": [6], "Q_DOXY_CTD": ["1_0"]}
+    )
+
+    graph.compute(data, ["oxygen"])
+
+    assert data["oxygen"][0] == 5
+
+
+def test_update_recalculates_changed_and_new_rows():
+    data = graph.compute(
+        pd.DataFrame(PHYSICS | {"id": [1, 2, 3]}), ["oxygen_saturation"]
+    )
+    delta = pd.DataFrame({"id": [4, 2], "temp": [8, 12], "salt": [32, 31]})
+    delta["depth"] = [20, 5]
+    delta["oxygen"] = [4, 6]
+    changed = pd.DataFrame(
+        {
+            "oxygen": [5, 6, 7, 4],
+            "temp": [10, 12, 20, 8],
+            "salt": [30, 31, 35, 32],
+            "depth": [0, 5, 10, 20],
+            "id": [1, 2, 3, 4],
+        }
+    )
+
+    result = graph.update(data, delta, ["oxygen_saturation"], on="id")
+
+    pd.testing.assert_frame_equal(
+        result, graph.compute(changed, ["oxygen_saturation"]), check_dtype=False
+    )
+    assert data["temp"][1] == 15
+    assert result.dtypes[["id", "temp", "salt", "depth"]].eq("int64").all()
+
+
+def test_update_only_calculates_delta():
+    data = graph.compute(pd.DataFrame(PHYSICS), ["oxygen_saturation"])
+    # oxygen is given, not calculated from DOXY_BTL and DOXY_CTD
+    delta = pd.DataFrame({"oxygen": [3.0]}, index=[1])
+
+    result = graph.update(data, delta, ["oxygen_saturation"])
+
+    assert result["oxygen_saturation"][1] == pytest.approx(
+        data["oxygen_saturation"][1] / 2
+    )
+    pd.testing.assert_frame_equal(
+        result.drop(index=1), data.drop(index=1), check_dtype=False
+    )
+
+
+def test_update_din_after_flag_correction():
+    parameters = ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL", "DOXY_CTD")
+    data = pd.DataFrame(
+        {parameter: [5.0, 5.0] for parameter in parameters}
+        | {f"Q_{parameter}": ["1_0", "1_0"] for parameter in parameters}
+    )
+    data["H2S"] = np.nan
+    data = graph.compute(data, ["din", "oxygen"])
+    delta = pd.DataFrame({"Q_AMON": ["4_0"]}, index=[1])
+
+    result = graph.update(data, delta, ["din", "oxygen"])
+
+    expected = data.drop(columns=["NTRZ_corrected", "din", "oxygen"])
+    expected.loc[1, "Q_AMON"] = "4_0"
+    pd.testing.assert_frame_equal(
+        result, graph.compute(expected, ["din", "oxygen"])[result.columns]
+    )
+
+
+def test_oxygen_parameters_match_calculate():
+    data = pd.DataFrame(PHYSICS)
+    expected = calculate.oxygen_parameters(data.copy())
+
+    graph.compute(data, ["aou", "aou_umol_kg", "oxygen_umol_kg"])
+
+    pd.testing.assert_frame_equal(
+        data.drop(columns=["pressure", "potential_temperature"]),
+        expected[data.columns.drop(["pressure", "potential_temperature"])],
+    )
+
+
+def test_latitude_is_used_when_present():
+    data = pd.DataFrame(PHYSICS | {"latitude": [55.0, 60.0, 65.0]})
+
+    graph.compute(data, ["density"])
+
+    np.testing.assert_array_equal(
+        data["density"], calculate.density(data, inplace=False, latitude="latitude")
+    )
+
+
+def test_update_inplace_with_new_column():
+    data = graph.compute(pd.DataFrame(PHYSICS), ["oxygen_saturation"])
+    delta = pd.DataFrame({"oxygen": [3.0], "comment": ["x"]}, index=[1])
+
+    result = graph.update(data, delta, ["oxygen_saturation"], inplace=True)
+
+    assert result is data
+    assert data["oxygen"].tolist() == [5, 3, 7]
+    assert data["comment"].isna().tolist() == [True, False, True]
+    expected = graph.compute(
+        pd.DataFrame(PHYSICS | {"oxygen": [5.0, 3.0, 7.0]}), ["oxygen_saturation"]
+    )
+    pd.testing.assert_series_equal(
+        data["oxygen_saturation"], expected["oxygen_saturation"]
+    )
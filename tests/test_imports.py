@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SCRIPT = """
+import sys
+import pandas as pd
+from nodc_calculations import calculate
+
+def loaded():
+    return sorted(module for module in ("gsw", "seawater", "numba") if module in sys.modules)
+
+print(loaded())
+data = pd.DataFrame({"oxygen": [5], "temp": [10], "salt": [30], "depth": [0]})
+calculate.oxygen_saturation(data)
+print(loaded())
+"""
+
+
+def test_seawater_modules_are_imported_on_first_use():
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+
+    assert output[0] == "[]"
+    assert "gsw" in output[1]
+    assert "seawater" not in output[1]
+
+
+def test_numba_is_imported_on_first_use():
+    pytest.importorskip("numba")
+    script = (
+        "import sys\n"
+        "from nodc_calculations import arrays, kernels\n"
+        "print('numba' in sys.modules)\n"
+        "kernels.numba\n"
+        "print('numba' in sys.modules)\n"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout.split()
+
+    assert output == ["False", "True"]
+
+
+def test_din_does_not_import_seawater_modules(tmp_path):
+    script = (
+        "import sys\n"
+        "import numpy as np\n"
+        "import pandas as pd\n"
+        "from nodc_calculations import calculate\n"
+        "data = pd.DataFrame({\n"
+        "    parameter: [1.0] for parameter in ('NTRA', 'NTRI', 'NTRZ', 'AMON', 'H2S')\n"
+        "} | {'DOXY_BTL': [5.0], 'H2S': [np.nan]})\n"
+        "for parameter in ('NTRA', 'NTRI', 'NTRZ', 'AMON', 'H2S', 'DOXY_BTL'):\n"
+        "    data[f'Q_{parameter}'] = '1_0'\n"
+        "calculate.dissolved_inorganic_nitrogen(data)\n"
+        "print(data['din'][0], 'gsw' in sys.modules, 'seawater' in sys.modules)\n"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=os.environ | {"NODC_CALCULATIONS_CACHE": str(tmp_path)},
+    ).stdout.split()
+
+    assert output == ["2.0", "False", "False"]
+
+
+def test_gsw_is_not_imported_by_the_cli_and_the_caches():
+    script = (
+        "import sys\n"
+        "from nodc_calculations import cli, memo, store, tables\n"
+        "print('gsw' in sys.modules, 'seawater' in sys.modules)\n"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout.split()
+
+    assert output == ["False", "False"]
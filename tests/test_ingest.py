@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+from nodc_calculations import ingest, pipeline
+
+STEPS = ["dissolved_inorganic_nitrogen", "oxygen"]
+
+
+@pytest.fixture
+def jobs(tmp_path, random_data):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "output").mkdir()
+    jobs = {}
+    for seed, (name, size) in enumerate((("a.txt", 500), ("b.txt", 0), ("c.csv", 333))):
+        data = random_data(size, seed=seed, missing=0)
+        source = tmp_path / "data" / name
+        data.to_csv(source, sep="\t" if name.endswith(".txt") else ",", index=False)
+        jobs[source] = tmp_path / "output" / name
+    return jobs
+
+
+@pytest.mark.parametrize("workers,executor", [(1, "thread"), (2, "process")])
+def test_ingest_matches_stream(tmp_path, jobs, workers, executor):
+    rows = asyncio.run(
+        ingest.ingest(jobs, STEPS, chunksize=50, workers=workers, executor=executor)
+    )
+
+    assert rows == dict(zip(jobs, (500, 0, 333)))
+    for source, sink in jobs.items():
+        expected = tmp_path / f"expected{source.suffix}"
+        pipeline.stream(source, expected, STEPS, chunksize=50)
+        assert sink.read_bytes() == expected.read_bytes()
+
+
+def test_memory_is_bounded(jobs, monkeypatch):
+    # the calculations are slow, so reading may only get the queues ahead of them
+    read = []
+    in_flight = []
+    original = pipeline.read_chunks
+
+    def read_chunks(*args, **kwargs):
+        for chunk in original(*args, **kwargs):
+            read.append(len(chunk))
+            yield chunk
+
+    def slow(df):
+        in_flight.append(len(read) - slow.calculated)
+        time.sleep(0.005)
+        slow.calculated += 1
+
+    slow.calculated = 0
+    monkeypatch.setattr(pipeline, "read_chunks", read_chunks)
+    asyncio.run(ingest.ingest(jobs, [slow], chunksize=10, readers=2, queue_size=3))
+
+    assert slow.calculated == len(read) == 50 + 1 + 34
+    # queue_size + 2 * workers + readers + 1
+    assert max(in_flight) <= 3 + 2 + 2 + 1
+
+
+def test_failures_are_raised(jobs):
+    def fail(df):
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError, match="failed"):
+        asyncio.run(ingest.ingest(jobs, [fail]))
+    with pytest.raises(ValueError, match="Unknown calculation"):
+        asyncio.run(ingest.ingest(jobs, ["unknown"]))
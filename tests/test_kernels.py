@@ -0,0 +1,135 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import arrays, calculate, flags, kernels, rules
+
+# the arguments of the DIN kernel, in order
+PARAMETERS = ("NTRA", "NTRI", "NTRZ", "AMON", "H2S", "DOXY_BTL")
+
+
+def _kernel_arguments(data):
+    return [
+        array
+        for parameter in PARAMETERS
+        for array in (data[parameter].to_numpy(), flags.encode(data[f"Q_{parameter}"]))
+    ]
+
+
+def _din(data, jit=True):
+    # the generated loop for NTRZ_corrected and DIN
+    context = arrays._din_context(None, *_kernel_arguments(data))
+    results = rules.compile(arrays._DIN_SELECTIONS, jit)(context.values, context.bits)
+    return results["NTRZ_corrected"], results["din"]
+
+
+def _original_din(df):
+    # frozen copy of the np.where cascade that DIN was first defined by, the
+    # reference for the rule tables and everything generated from them
+    def valid(parameter, rejected="4|3|B|S"):
+        return ~pd.isna(df[parameter]) & ~df[f"Q_{parameter}"].str.contains(rejected)
+
+    def below_detection(parameter):
+        return ~pd.isna(df[parameter]) & df[f"Q_{parameter}"].str.contains("6|<")
+
+    ntrz_corrected = np.where(
+        pd.isna(df.NTRZ) & below_detection("NTRA") & below_detection("NTRI"),
+        df.NTRA,
+        np.where(
+            pd.isna(df.NTRZ) & valid("NTRA"),
+            np.nansum([df.NTRA, df.NTRI], axis=0),
+            np.where(valid("NTRZ"), df.NTRZ, np.nan),
+        ),
+    )
+
+    has_ntrz_corrected = ~pd.isna(ntrz_corrected)
+    valid_h2s = valid("H2S", "6|4|3|B|S|<")
+    valid_amon = valid("AMON")
+    below_detection_amon = below_detection("AMON")
+    valid_low_doxy = (df.DOXY_BTL <= 2) & ~df.Q_DOXY_BTL.str.contains("4|3|B|S")
+
+    din = np.where(valid_h2s & valid_amon, df.AMON, np.nan)
+    din = np.where(
+        valid_low_doxy & valid_amon,
+        np.nansum([ntrz_corrected, df.AMON], axis=0),
+        din,
+    )
+    din = np.where(
+        (below_detection("NTRZ") | below_detection("NTRA"))
+        & below_detection_amon
+        & has_ntrz_corrected,
+        ntrz_corrected,
+        din,
+    )
+    din = np.where(
+        valid_amon
+        & ~valid_low_doxy
+        & ~valid_h2s
+        & ~below_detection_amon
+        & has_ntrz_corrected,
+        ntrz_corrected + df.AMON,
+        np.where(
+            ~valid_low_doxy & ~valid_h2s & below_detection_amon & has_ntrz_corrected,
+            ntrz_corrected,
+            din,
+        ),
+    )
+    return ntrz_corrected, din
+
+
+@pytest.mark.parametrize("implementation", ["numpy", "compiled"])
+def test_din_matches_the_original_cascade(random_data, implementation):
+    data = random_data(5000, parameters=PARAMETERS)
+    if implementation == "numpy":
+        result = arrays._din(*_kernel_arguments(data))
+    else:
+        pytest.importorskip("numba")
+        result = _din(data)
+
+    np.testing.assert_array_equal(result, _original_din(data))
+
+
+def test_compiled_din_kernel_matches_python_loop(random_data):
+    pytest.importorskip("numba")
+    data = random_data(2000, seed=1, parameters=PARAMETERS)
+
+    np.testing.assert_array_equal(_din(data), _din(data, jit=False))
+
+
+def test_generated_source_is_cached(tmp_path, monkeypatch):
+    pytest.importorskip("numba")
+    monkeypatch.setenv("NODC_CALCULATIONS_CACHE", str(tmp_path))
+    source = "def _double(x):\n    return 2 * x\n"
+
+    assert kernels.compile_source(source, "_double")(2.5) == 5.0
+    assert len(list((tmp_path / "kernels").glob("generated_*.py"))) == 1
+
+
+@pytest.mark.parametrize(
+    "given_data",
+    (
+        # H2S and AMON valid
+        {"H2S": [5], "Q_H2S": ["1_0"], "AMON": [3], "Q_AMON": ["1_0"],
+         "DOXY_BTL": [5], "Q_DOXY_BTL": ["1_0"], "NTRZ": [np.nan], "Q_NTRZ": ["1_0"],
+         "NTRA": [2], "Q_NTRA": ["1_0"], "NTRI": [1], "Q_NTRI": ["1_0"]},
+        # low correct DOXY_BTL, no AMON data
+        {"H2S": [np.nan], "Q_H2S": ["1_0"], "AMON": [np.nan], "Q_AMON": ["1_0"],
+         "DOXY_BTL": [1], "Q_DOXY_BTL": ["1_0"], "NTRZ": [3], "Q_NTRZ": ["1_0"],
+         "NTRA": [3], "Q_NTRA": ["4_0"], "NTRI": [2], "Q_NTRI": ["1_0"]},
+        # all valid, no NTRZ
+        {"H2S": [np.nan], "Q_H2S": ["0_0"], "AMON": [5], "Q_AMON": ["1_0"],
+         "DOXY_BTL": [5], "Q_DOXY_BTL": ["1_0"], "NTRZ": [np.nan], "Q_NTRZ": ["1_0"],
+         "NTRA": [7], "Q_NTRA": ["1_0"], "NTRI": [2], "Q_NTRI": ["1_0"]},
+        # AMON below det, no H2S
+        {"H2S": [np.nan], "Q_H2S": ["0_0"], "AMON": [1], "Q_AMON": ["6_0"],
+         "DOXY_BTL": [5], "Q_DOXY_BTL": ["1_0"], "NTRZ": [11], "Q_NTRZ": ["1_0"],
+         "NTRA": [7], "Q_NTRA": ["1_0"], "NTRI": [2], "Q_NTRI": ["1_0"]},
+        # everything below det
+        {"H2S": [np.nan], "Q_H2S": ["0_0"], "AMON": [0.5], "Q_AMON": ["6_0"],
+         "DOXY_BTL": [8], "Q_DOXY_BTL": ["1_0"], "NTRZ": [4], "Q_NTRZ": ["6_0"],
+         "NTRA": [3], "Q_NTRA": ["6_0"], "NTRI": [2], "Q_NTRI": ["6_0"]},
+    ),
+)  # fmt: skip
+def test_din_kernel_matches_get_din(given_data):
+    _, din = _din(pd.DataFrame(given_data))
+
+    np.testing.assert_equal(din[0], calculate._get_DIN(given_data))
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from nodc_calculations import calculate, legacy
+
+
+def test_legacy_din_matches_get_din(random_data):
+    data = random_data(1000, parameters=legacy.DIN_INPUTS, decimals=2)
+    data["DOXY_BTL"] = data["DOXY_BTL"] / 2
+
+    result, _ = legacy.din(data)
+
+    for i, row in enumerate(data.to_dict("records")):
+        expected = calculate._get_DIN({key: [value] for key, value in row.items()})
+        np.testing.assert_equal(result[i], expected)
+
+
+def test_compare_din():
+    data = pd.DataFrame(
+        {
+            # the same in both definitions
+            "H2S": [np.nan, np.nan],
+            "Q_H2S": ["1_0", "1_0"],
+            "AMON": [5, 1],
+            "Q_AMON": ["1_0", "6_0"],
+            "DOXY_BTL": [5, 1],
+            "Q_DOXY_BTL": ["1_0", "1_0"],
+            "NTRZ": [10, 3],
+            "Q_NTRZ": ["1_0", "1_0"],
+            "NTRA": [7, 3],
+            "Q_NTRA": ["1_0", "4_0"],
+            "NTRI": [2, 2],
+            "Q_NTRI": ["1_0", "1_0"],
+        },
+        index=["a", "b"],
+    )
+
+    report = legacy.compare_din(data)
+
+    # case 5 in test_calculate, AMON below detection at low oxygen
+    assert list(report.index) == ["b"]
+    assert report.loc["b", "din"] == 4
+    assert report.loc["b", "legacy_din"] == 3
+    assert report.loc["b", "din_branch"] == "low_oxygen"
+    assert report.loc["b", "legacy_branch"] == "low_oxygen"
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from nodc_calculations import arrays, calculate, memo
+
+PROFILE = {
+    "oxygen": [5, 6, 7, 5, 6],
+    "temp": [10, 15, 20, 10, 15],
+    "salt": [30, 31, 35, 30, 31],
+    "depth": [0, 5, 10, 0, 5],
+}
+
+
+def test_exact_cache_matches_gsw():
+    data = pd.DataFrame(PROFILE)
+    cache = memo.SeawaterCache()
+    expected = calculate.oxygen_saturation(data.copy(), inplace=False)
+
+    result = calculate.oxygen_saturation(data.copy(), inplace=False, backend=cache)
+
+    pd.testing.assert_series_equal(result, expected)
+    # five rows with three distinct, looked up for density and for solubility
+    assert cache.stats["misses"] == 10
+    assert cache.stats["hits"] == 0
+    assert cache.stats["size"] == 6
+
+    calculate.oxygen_saturation(data.copy(), inplace=False, backend=cache)
+
+    assert cache.stats["misses"] == 10
+    assert cache.stats["hits"] == 10
+
+
+def test_quantized_cache():
+    cache = memo.SeawaterCache(decimals=2)
+    salt = np.array([30.0, 30.001, 30.002])
+    temp = np.array([10.0, 10.0, 10.001])
+
+    result = arrays.density(salt, temp, [0, 0, 0], backend=cache)
+
+    assert cache.stats["size"] == 1
+    np.testing.assert_allclose(result, arrays.density(salt, temp, [0, 0, 0]), atol=1e-2)
+    assert len(set(result)) == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = memo.SeawaterCache(maxsize=2)
+
+    cache.O2sol_SP_pt([30.0, 31.0], [10.0, 10.0])
+    cache.O2sol_SP_pt([30.0], [10.0])
+    cache.O2sol_SP_pt([32.0], [10.0])
+    cache.O2sol_SP_pt([30.0, 31.0], [10.0, 10.0])
+
+    # 31 was evicted when 32 was added, 30 was kept since it was used more recently
+    assert cache.stats == {"hits": 2, "misses": 4, "size": 2, "maxsize": 2}
+
+
+def test_missing_values_and_empty_input():
+    cache = memo.SeawaterCache()
+
+    result = cache.O2sol_SP_pt([np.nan, np.nan, 30.0], [10.0, 10.0, 10.0])
+
+    assert np.isnan(result[:2]).all() and not np.isnan(result[2])
+    assert cache.O2sol_SP_pt([], []).shape == (0,)
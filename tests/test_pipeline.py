@@ -0,0 +1,76 @@
+import pytest
+import pandas as pd
+from nodc_calculations import pipeline
+
+STEPS = ["dissolved_inorganic_nitrogen", "oxygen"]
+
+
+@pytest.mark.parametrize("suffix", (".csv", ".txt", ".parquet"))
+def test_stream_matches_full_frame(tmp_path, random_data, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    data = random_data(1000, decimals=3)
+    source = tmp_path / f"source{suffix}"
+    sink = tmp_path / f"sink{suffix}"
+    if suffix == ".parquet":
+        data.to_parquet(source)
+    else:
+        data.to_csv(source, sep="\t" if suffix == ".txt" else ",", index=False)
+    expected = pipeline.apply_steps(next(pipeline.read_chunks(source, 10**6)), STEPS)
+
+    rows = pipeline.stream(source, sink, STEPS, chunksize=77)
+
+    assert rows == len(data)
+    result = next(pipeline.read_chunks(sink, 10**6))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_integer_column_with_a_gap_in_one_chunk(tmp_path, random_data):
+    data = random_data(300, missing=0, decimals=3)
+    # written as 0, and empty in the third chunk
+    data.insert(0, "DEPH", pd.array([0] * 250 + [None] + [0] * 49, dtype="Int64"))
+    data.to_csv(tmp_path / "source.csv", index=False)
+    expected = pipeline.apply_steps(pd.read_csv(tmp_path / "source.csv"), STEPS)
+
+    pipeline.stream(tmp_path / "source.csv", tmp_path / "sink.csv", STEPS, 100)
+
+    assert (tmp_path / "sink.csv").read_text() == expected.to_csv(index=False)
+
+
+def test_unknown_step():
+    with pytest.raises(ValueError):
+        pipeline.apply_steps(pd.DataFrame(), ["no_such_calculation"])
+
+
+@pytest.mark.parametrize("executor", ("thread", "process"))
+def test_run_pipeline_in_parallel(random_data, executor):
+    data = random_data(1001, decimals=3)
+    data["temp"], data["salt"], data["depth"] = 10.0, 30.0, 5.0
+    data["oxygen"] = data["DOXY_CTD"]
+    steps = STEPS[:1] + ["oxygen_saturation"]
+    expected = pipeline.apply_steps(data.copy(), steps)
+
+    result = pipeline.run_pipeline(data, steps, workers=3, executor=executor)
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert "din" not in data.columns
+
+
+def test_stream_in_parallel(tmp_path, random_data):
+    data = random_data(500, decimals=3)
+    data.to_csv(tmp_path / "source.csv", index=False)
+    pipeline.stream(
+        tmp_path / "source.csv", tmp_path / "serial.csv", STEPS, chunksize=90
+    )
+
+    pipeline.stream(
+        tmp_path / "source.csv",
+        tmp_path / "parallel.csv",
+        STEPS,
+        chunksize=90,
+        workers=2,
+        executor="thread",
+    )
+
+    serial = (tmp_path / "serial.csv").read_text()
+    assert (tmp_path / "parallel.csv").read_text() == serial
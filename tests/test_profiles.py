@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import profiles
+
+
+def test_layers():
+    data = pd.DataFrame(
+        {
+            "visit": ["b", "a", "a", "a", "a", "b"],
+            "depth": [0, 20, 5, 0, 10, 30],
+            "din": [2, 3, 1, 1, 3, 2],
+            "oxygen": [np.nan, 5, 5, np.nan, 5, np.nan],
+        }
+    )
+
+    result = profiles.inventories(data, layers=[(0, 10), (0, None), (2, 8), (40, 50)])
+
+    assert list(result.index) == ["a", "b"]
+    np.testing.assert_allclose(result["din_integral_0_10"], [15, 20])
+    np.testing.assert_allclose(result["din_mean_0_10"], [1.5, 2])
+    np.testing.assert_allclose(result["din_integral_0_bottom"], [45, 60])
+    np.testing.assert_allclose(result["din_mean_0_bottom"], [2.25, 2])
+    np.testing.assert_allclose(
+        result["din_integral_2_8"], [3 * 1 + (1 + 2.2) / 2 * 3, 12]
+    )
+    # oxygen is only sampled from 5 m in a, and not at all in b
+    np.testing.assert_allclose(result["oxygen_integral_0_10"], [25, np.nan])
+    np.testing.assert_allclose(result["oxygen_mean_0_bottom"], [5, np.nan])
+    assert result["din_integral_40_50"].isna().all()
+
+
+def test_matches_groupby():
+    rng = np.random.default_rng(0)
+    size = 2000
+    data = pd.DataFrame(
+        {
+            "station": rng.integers(0, 50, size),
+            "date": rng.choice(["2024-01-01", "2024-06-01"], size),
+            "depth": rng.choice([0, 5, 10, 15, 20, 30, 50, 75, 100], size),
+            "din": rng.uniform(0, 10, size),
+        }
+    ).drop_duplicates(["station", "date", "depth"])
+
+    result = profiles.inventories(
+        data, ["din"], layers=[(0, 10), (0, None)], by=["station", "date"]
+    )
+
+    for (station, date), profile in data.groupby(["station", "date"]):
+        profile = profile.sort_values("depth")
+        expected = (
+            np.trapezoid(profile.din, profile.depth) if len(profile) > 1 else np.nan
+        )
+        assert result.loc[(station, date), "din_integral_0_bottom"] == pytest.approx(
+            expected, nan_ok=True
+        )
+    assert result.index.names == ["station", "date"]
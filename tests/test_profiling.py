@@ -0,0 +1,68 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from nodc_calculations import arrays, calculate, profiling
+
+DATA = {
+    "oxygen": [5.0] * 1000,
+    "temp": [10.0] * 1000,
+    "salt": [30.0] * 1000,
+    "depth": [5.0] * 1000,
+}
+
+
+def test_no_records_without_profiler():
+    assert profiling.stage("density") is profiling.stage("oxygen")
+
+    with profiling.Profiler() as profiler:
+        pass
+    calculate.oxygen_saturation(pd.DataFrame(DATA))
+
+    assert profiler.records == []
+
+
+def test_records_for_calculation_and_stages():
+    with profiling.Profiler() as profiler:
+        calculate.oxygen_saturation(pd.DataFrame(DATA))
+
+    names = [record.name for record in profiler.records]
+    assert names == [
+        "pressure",
+        "density",
+        "potential_temperature",
+        "oxygen_solubility",
+        "oxygen_saturation.assign",
+        "calculate.oxygen_saturation",
+    ]
+    assert all(record.rows == 1000 for record in profiler.records)
+    assert all(record.allocated_bytes is None for record in profiler.records)
+    summary = profiler.summary()
+    assert summary.loc["calculate.oxygen_saturation", "calls"] == 1
+    assert summary.loc["pressure", "rows_per_second"] > 0
+
+
+def test_memory_tracing_and_callback():
+    received = []
+
+    with profiling.Profiler(trace_memory=True, callback=received.append) as profiler:
+        arrays.density(
+            np.full(100_000, 30.0), np.full(100_000, 10.0), np.zeros(100_000)
+        )
+
+    assert received == profiler.records
+    pressure, density = profiler.records
+    # at least the result array of 100000 floats
+    assert pressure.allocated_bytes >= 800_000
+    assert density.allocated_bytes >= 800_000
+
+
+def test_log(caplog):
+    with profiling.Profiler() as profiler:
+        arrays.pressure([0.0, 10.0])
+
+    with caplog.at_level(logging.INFO, logger="nodc_calculations.profiling"):
+        profiler.log()
+
+    assert caplog.records[0].profile["name"] == "pressure"
+    assert caplog.records[0].profile["rows"] == 2
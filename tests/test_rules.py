@@ -0,0 +1,100 @@
+import dataclasses
+
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import flags, rules
+
+
+@dataclasses.dataclass(frozen=True)
+class Counted(rules.Missing):
+    calls: list = dataclasses.field(default_factory=list, compare=False, hash=False)
+
+    def evaluate(self, context):
+        self.calls.append(self.parameter)
+        return super().evaluate(context)
+
+
+def test_first_applying_rule_is_selected():
+    phosphate = rules.Selection(
+        (
+            rules.Rule("below_detection", rules.BelowDetection("PHOS"), 0),
+            rules.Rule("valid", rules.Valid("PHOS"), "PHOS"),
+            rules.Rule("total", rules.Valid("PTOT"), lambda values: values["PTOT"] / 2),
+        )
+    )
+    values = {
+        "PHOS": np.array([1.0, 0.1, 2.0, np.nan]),
+        "PTOT": np.array([3.0, 3, 4, np.nan]),
+    }
+    bits = {
+        "PHOS": flags.encode(pd.Series(["1_0", "<_0", "4_0", "1_0"])),
+        "PTOT": flags.encode(pd.Series(["1_0", "1_0", "1_0", "1_0"])),
+    }
+
+    np.testing.assert_array_equal(phosphate(values, bits), [1, 0, 2, np.nan])
+
+
+def test_shared_conditions_are_evaluated_once():
+    missing = Counted("NTRZ")
+    selection = rules.Selection(
+        (
+            rules.Rule("a", missing & rules.AtMost("NTRA", 1), 1),
+            rules.Rule("b", missing & rules.AtMost("NTRA", 2), 2),
+            rules.Rule("c", ~missing, 3),
+        )
+    )
+
+    result = selection(
+        {"NTRZ": np.array([np.nan, np.nan, 5]), "NTRA": np.array([1.0, 2, 3])}, {}
+    )
+
+    np.testing.assert_array_equal(result, [1, 2, 3])
+    assert missing.calls == ["NTRZ"]
+
+
+@pytest.mark.parametrize("jit", [False, True])
+def test_compiled_selections_match_select(jit):
+    if jit:
+        pytest.importorskip("numba")
+    rng = np.random.default_rng(0)
+    values = {parameter: rng.uniform(0, 2, 1000) for parameter in ("PHOS", "PTOT")}
+    values["PHOS"][rng.random(1000) < 0.3] = np.nan
+    bits = {
+        parameter: flags.encode(pd.Series(rng.choice(["1_0", "<_0", "4_0"], 1000)))
+        for parameter in values
+    }
+    phosphate = rules.Selection(
+        (
+            rules.Rule("below_detection", rules.BelowDetection("PHOS"), 0),
+            rules.Rule("valid", rules.Valid("PHOS") & rules.AtMost("PHOS", 1), "PHOS"),
+            rules.Rule("total", rules.Valid("PTOT"), rules.Sum(("PHOS", "PTOT"), True)),
+        )
+    )
+    doubled = rules.Selection(
+        (rules.Rule("all", ~rules.Missing("P"), rules.Sum(("P", "P"))),)
+    )
+
+    result = rules.compile((("P", phosphate), ("doubled", doubled)), jit)(values, bits)
+
+    expected = phosphate(values, bits)
+    np.testing.assert_array_equal(result["P"], expected)
+    np.testing.assert_array_equal(result["doubled"], doubled({"P": expected}, {}))
+
+
+def test_function_outputs_can_not_be_compiled():
+    selection = rules.Selection(
+        (rules.Rule("all", rules.Missing("PHOS"), lambda values: values["PHOS"]),)
+    )
+
+    with pytest.raises(ValueError, match="can not be compiled"):
+        rules.compile((("PHOS", selection),))
+
+
+def test_conditions_need_evaluate_and_source():
+    class Positive(rules.Condition):
+        def evaluate(self, context):
+            return context.values["NTRA"] > 0
+
+    with pytest.raises(TypeError, match="source"):
+        Positive()
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+import pandas as pd
+from nodc_calculations import graph, store
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    size = 1000
+    return pd.DataFrame(
+        {
+            "salt": rng.uniform(5, 35, size),
+            "temp": rng.uniform(0, 20, size),
+            "depth": rng.uniform(0, 200, size),
+            "oxygen": rng.uniform(0, 9, size),
+        }
+    )
+
+
+def test_results_match_graph(tmp_path, data):
+    expected = graph.compute(data.copy(), ["oxygen_saturation"])
+
+    result = store.ResultStore(tmp_path, chunksize=300).compute(
+        data.copy(), ["oxygen_saturation"]
+    )
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_unchanged_chunks_are_read_from_the_store(tmp_path, data):
+    store.ResultStore(tmp_path, chunksize=300).compute(
+        data.copy(), ["oxygen_saturation"]
+    )
+    data.loc[500, "temp"] = 4.0
+    expected = graph.compute(data.copy(), ["oxygen_saturation"])
+
+    results = store.ResultStore(tmp_path, chunksize=300)
+    result = results.compute(data.copy(), ["oxygen_saturation"])
+
+    assert (results.hits, results.misses) == (3, 1)
+    assert results.stats["files"] == 5
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_eviction(tmp_path, data):
+    results = store.ResultStore(tmp_path, chunksize=100)
+    results.compute(data.copy(), ["density"])
+    size = results.stats["bytes"] // 10
+    results.clear()
+
+    results = store.ResultStore(tmp_path, max_bytes=3 * size, chunksize=100)
+    results.compute(data.copy(), ["density"])
+
+    assert results.stats["files"] == 3
+    # the most recently written chunks are kept
+    results.compute(data.iloc[800:].copy(), ["density"])
+    assert (results.hits, results.misses) == (2, 10)
+
+    results.clear()
+    assert results.stats["files"] == 0
@@ -0,0 +1,82 @@
+import pytest
+import gsw
+import numpy as np
+from nodc_calculations import arrays, kernels, tables
+
+
+@pytest.fixture
+def lookup(tmp_path):
+    return tables.LookupTables(cache_dir=tmp_path)
+
+
+def _random_points(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(0, 40, size),
+        rng.uniform(-2, 30, size),
+        rng.uniform(0, 500, size),
+    )
+
+
+def test_interpolation_error(lookup):
+    salt, temp, pressure = _random_points(10000)
+
+    np.testing.assert_allclose(
+        lookup.pot_rho_t_exact(salt, temp, pressure, 0),
+        gsw.pot_rho_t_exact(salt, temp, pressure, 0),
+        rtol=0,
+        atol=5e-4,
+    )
+    np.testing.assert_allclose(
+        lookup.O2sol_SP_pt(salt, temp), gsw.O2sol_SP_pt(salt, temp), rtol=0, atol=1e-2
+    )
+
+
+def test_numpy_interpolation_matches_kernel(lookup):
+    if kernels.numba is None:
+        pytest.skip("numba is not installed")
+    points = list(_random_points(1000, seed=1))
+    grids = (tables.SALT, tables.TEMP, tables.PRESSURE)
+    table = lookup.table(
+        "pot_rho_t_exact", grids, lambda SA, t, p: gsw.pot_rho_t_exact(SA, t, p, 0)
+    )
+
+    np.testing.assert_allclose(
+        tables._interpolate(table, grids, points),
+        kernels.interpolate(table, grids, *points),
+        rtol=1e-12,
+    )
+
+
+def test_outside_grid_and_missing_values_use_gsw(lookup):
+    salt = np.array([45.0, 30.0, np.nan, 30.0])
+    temp = np.array([10.0, 35.0, 10.0, 10.0])
+
+    result = lookup.O2sol_SP_pt(salt, temp)
+
+    np.testing.assert_array_equal(result[:3], gsw.O2sol_SP_pt(salt[:3], temp[:3]))
+    assert result[3] == pytest.approx(gsw.O2sol_SP_pt(30.0, 10.0), abs=1e-2)
+
+
+def test_tables_are_cached_on_disk(tmp_path):
+    tables.LookupTables(cache_dir=tmp_path).O2sol_SP_pt([30.0], [10.0])
+    assert len(list(tmp_path.glob("O2sol_SP_pt-*.npy"))) == 1
+
+    def not_called(*args):
+        raise AssertionError("the table should be loaded from the cache")
+
+    table = tables.LookupTables(cache_dir=tmp_path).table(
+        "O2sol_SP_pt", (tables.SALT, tables.TEMP), not_called
+    )
+
+    assert isinstance(table, np.memmap)
+
+
+def test_fast_backend_for_density(lookup):
+    salt, temp, depth = [30.0, 7.0], [10.0, 4.0], [0.0, 100.0]
+
+    np.testing.assert_allclose(
+        arrays.density(salt, temp, depth, backend=lookup),
+        arrays.density(salt, temp, depth),
+        atol=5e-4,
+    )